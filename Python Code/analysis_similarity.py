@@ -0,0 +1,1142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 09:12:40 2026
+
+@author: ejreidelbach
+
+:DESCRIPTION:
+    Shared similarity score engine for the position analysis scripts:
+        - analysis_wide_receivers_by_age.py
+        - analysis_wide_receivers_by_season.py
+        - analysis_quarterbacks_by_age.py
+        - analysis_quarterbacks_by_season.py
+
+    Every player season within a group (i.e. an age or a years of experience
+    value) is compared to every other player season in that same group.  The
+    deviance between two players is the sum of the squared differences in
+    their deviation (z-score) for every statistic that both players have a
+    value for, and the similarity score is `100 - deviance`.
+
+    Rather than looping over every pair of players in Python, the deviations
+    for a group are stored in one players x stats matrix and the deviance
+    for all pairs is computed with matrix operations.  Missing values (NaN)
+    are handled with a mask so that a statistic only counts towards a pair's
+    deviance when both players have a value for it:
+
+        deviance(i, j) = sum_k m_ik * m_jk * (z_ik - z_jk)^2
+                       = (Z^2 M')_ij + (M Z^2')_ij - 2 (Z Z')_ij
+
+    where Z holds the deviations (with NaN replaced by 0) and M is the mask.
+
+    The statistics used for each position are defined in `STAT_PROFILES` and
+    `analyze_position` runs the whole process (load, deviations, scores and
+    output) for a position and every grouping variable in `GROUP_VARS`.
+
+    Running this module directly checks the incremental mode (`path_state`,
+    see `update_group_similarity`) against the full computation on random
+    player seasons (see `check_update_similarity`).
+
+:REQUIRES:
+    - Numpy
+    - Pandas
+
+:TODO:
+"""
+
+#==============================================================================
+# Package Import
+#==============================================================================
+import concurrent.futures
+import numpy as np
+import os
+import pandas as pd
+from pathlib import Path
+import tempfile
+import warnings
+
+#==============================================================================
+# Function Definitions
+#==============================================================================
+def calculate_deviations(playersDF, group_var, stats_list):
+    '''
+    Description:
+        This function will calculate the "DEVIANCE" (z-score) of every
+            statistic for every player season: the difference between the
+            player's stat and the mean of that stat across all player seasons
+            in the same group (i.e. age or years of experience), divided by
+            the standard deviation of the stat within the group.
+        The mean and standard deviation of every stat in every group are
+            computed with one grouped transform, so the deviations for the
+            whole position are calculated in a single vectorized pass.
+        Note:  A stat equal to the group's mean (or a stat that has the same
+            value for every season in its group) has a deviation of 0, while
+            a missing stat (or a stat without a standard deviation in its
+            group) has a deviation of NaN.  Seasons without a player url are
+            dropped.
+
+    Input:
+        playersDF (dataframe) - contains all player information and statistical
+            information
+        group_var (string) - name of the variable to group seasons by
+            (i.e. `age` or `years_exp`)
+        stats_list (list) - statistics to calculate deviations for
+
+    Output:
+        devianceDF (dataframe) - contains the `url`, the group variable and
+            the deviation of every statistic for every player season (one
+            row per season, in the same order as `playersDF`)
+    '''
+    playersDF = playersDF[~pd.isna(playersDF['url'])]
+    grouped = playersDF.groupby(group_var)[stats_list]
+
+    diffDF = playersDF[stats_list] - grouped.transform('mean')
+    stdDF = grouped.transform('std')
+    # a stat that is the same for every season in a group has no spread:
+    #   mask on the standard deviation (not the difference, which may keep
+    #   round-off from the mean) so those seasons get 0 rather than +/-inf
+    devianceDF = (diffDF / stdDF).mask((stdDF == 0) & ~pd.isna(diffDF), 0)
+
+    devianceDF.insert(0, group_var, playersDF[group_var])
+    devianceDF.insert(0, 'url', playersDF['url'])
+
+    return devianceDF
+
+def split_by_group(dataDF, group_var, stats_list, unique=True):
+    '''
+    Description:
+        This function will split a table of player seasons into one matrix
+            of statistics per group (i.e. age or years of experience) along
+            with the urls of the players in each row of the matrix.  The
+            table is sorted by group once and then sliced, rather than
+            filtered separately for every group.
+        Note:  If a player has more than one season in the same group, only
+            the last one is kept (matching the original dictionary-based
+            implementation, which overwrote earlier entries by url) unless
+            `unique` is False.  Seasons without a url or a group value are
+            dropped.
+
+    Input:
+        dataDF (dataframe) - contains the `url`, the group variable and the
+            statistics for every player season (i.e. the output of
+            `calculate_deviations`)
+        group_var (string) - name of the variable to group seasons by
+        stats_list (list) - statistics to include in the matrices
+        unique (boolean) - keep only the last season of every player in a
+            group (default: True)
+
+    Output:
+        group_dict (dictionary) - keys are every group value (sorted); each
+            value is a tuple of the player urls in that group and the
+            players x stats matrix of their statistics (same order)
+    '''
+    dataDF = dataDF[~pd.isna(dataDF['url']) & ~pd.isna(dataDF[group_var])]
+    if unique:
+        dataDF = dataDF.drop_duplicates(subset=[group_var, 'url'],
+                                        keep='last')
+
+    # sort by group (keeping the original order within every group)
+    order = np.argsort(dataDF[group_var].to_numpy(), kind='stable')
+    groups = dataDF[group_var].to_numpy()[order]
+    urls = dataDF['url'].to_numpy()[order]
+    values = dataDF[stats_list].to_numpy(dtype=np.float64)[order]
+
+    # slice the sorted data wherever the group changes
+    bounds = np.flatnonzero(groups[1:] != groups[:-1]) + 1
+    group_dict = {}
+    for start, stop in zip(np.r_[0, bounds], np.r_[bounds, len(groups)]):
+        if stop > start:
+            group_dict[groups[start].item()] = (urls[start:stop].tolist(),
+                                                values[start:stop])
+
+    return group_dict
+
+def calculate_pairwise_similarity_block(deviations, start, stop):
+    '''
+    Description:
+        This function will compute the similarity score between the players
+            in rows `start` to `stop` of a matrix of deviations and every
+            player in the matrix.  Only statistics that both players have a
+            value for are included in a pair's deviance.
+
+    Input:
+        deviations (ndarray) - players x stats matrix of deviations in which
+            missing values are stored as NaN
+        start (int) - first row of the block
+        stop (int) - row after the last row of the block
+
+    Output:
+        scores (ndarray) - (stop - start) x players matrix of similarity
+            scores (i.e. 100 - deviance)
+    '''
+    deviations = np.asarray(deviations, dtype=np.float64)
+    mask = ~np.isnan(deviations)
+    values = np.where(mask, deviations, 0.0)
+    squares = values ** 2
+    mask = mask.astype(np.float64)
+
+    # sum of each player's squared deviations over the stats the other
+    #   player also has (in both directions)
+    deviance = squares[start:stop] @ mask.T
+    deviance += mask[start:stop] @ squares.T
+    deviance -= 2 * (values[start:stop] @ values.T)
+
+    # remove any negative round-off left over from the expansion
+    np.maximum(deviance, 0, out=deviance)
+
+    return 100 - deviance
+
+def calculate_pairwise_similarity(deviations, block_size=None, out=None):
+    '''
+    Description:
+        This function will compute the similarity score between every pair
+            of players (rows) in a matrix of deviations.  Only statistics
+            that both players have a value for are included in a pair's
+            deviance.
+        If a `block_size` is specified, the players x players matrix is
+            filled in `block_size` rows at a time so that the working memory
+            is bounded by the size of a block rather than the square of the
+            number of players.
+
+    Input:
+        deviations (ndarray) - players x stats matrix of deviations in which
+            missing values are stored as NaN
+        block_size (int) - number of rows to compute at a time (optional)
+        out (ndarray) - preallocated players x players array (or memory-mapped
+            array) in which to store the scores (optional)
+
+    Output:
+        scores (ndarray) - players x players matrix of similarity scores
+            (i.e. 100 - deviance)
+    '''
+    player_count = len(deviations)
+    if block_size is None:
+        block_size = max(player_count, 1)
+    if out is None:
+        out = np.empty((player_count, player_count), dtype=np.float64)
+
+    for start in range(0, player_count, block_size):
+        stop = min(start + block_size, player_count)
+        out[start:stop] = calculate_pairwise_similarity_block(
+                deviations, start, stop)
+
+    return out
+
+def calculate_group_similarity(devianceDF, group_var, stats_list,
+                               block_size=None, path_memmap=None, workers=1):
+    '''
+    Description:
+        This function will split the deviance data into groups (i.e. age or
+            years of experience) and compute the similarity score between
+            every pair of players within each group.
+        Note:  If a player has more than one season in the same group, only
+            the last one is kept (see `split_by_group`).
+        If a `block_size` is specified, scores are computed in tiles and
+            stored as float32.  If a `path_memmap` folder is specified, each
+            group's matrix is written to a memory-mapped .npy file in that
+            folder instead of being held in memory.
+        If more than one worker is specified, every group (or every block of
+            rows within a group when a `block_size` is given) is scored in a
+            separate process.  Results are always stored in group/row order,
+            so the output does not depend on the number of workers.
+        Note:  On platforms that start worker processes by re-importing the
+            calling script (Windows, macOS), the script's working code must
+            be guarded by `if __name__ == '__main__':`.
+
+    Input:
+        devianceDF (dataframe) - contains the `url`, the group variable and
+            the deviation of every statistic for every player season
+        group_var (string) - name of the variable to group seasons by
+            (i.e. `age` or `years_exp`)
+        stats_list (list) - statistics to include in the deviance
+        block_size (int) - number of players to score at a time (optional)
+        path_memmap (string) - folder for memory-mapped score files (optional)
+        workers (int) - number of processes to score with (default: 1)
+
+    Output:
+        group_dict (dictionary) - keys are every group value (sorted); each
+            value is a tuple of the player urls in that group and the
+            players x players matrix of similarity scores (same order)
+    '''
+    if path_memmap is not None:
+        os.makedirs(path_memmap, exist_ok=True)
+
+    # extract the deviations for every group and allocate space for the scores
+    task_list = []
+    for group, (url_list, deviations) in split_by_group(
+            devianceDF, group_var, stats_list).items():
+        shape = (len(url_list), len(url_list))
+        dtype = np.float64 if block_size is None else np.float32
+        if path_memmap is not None:
+            out = np.lib.format.open_memmap(
+                    str(Path(path_memmap, 'similarity_%s_%s.npy' % (
+                            group_var, group))),
+                    mode='w+', dtype=dtype, shape=shape)
+        else:
+            out = np.empty(shape, dtype=dtype)
+
+        task_list.append((group, url_list, deviations, out))
+
+    group_dict = {}
+    if workers is None or workers <= 1:
+        for group, url_list, deviations, out in task_list:
+            group_dict[group] = (url_list, calculate_pairwise_similarity(
+                    deviations, block_size, out))
+            print('Done with computing scores for ' + group_var + ': ' +
+                  str(group))
+        return group_dict
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        # submit every block of every group to the pool of workers
+        future_list = []
+        for group, url_list, deviations, out in task_list:
+            step = max(len(url_list), 1) if block_size is None else block_size
+            futures = [(start, pool.submit(
+                    calculate_pairwise_similarity_block, deviations, start,
+                    min(start + step, len(url_list))))
+                    for start in range(0, len(url_list), step)]
+            future_list.append(futures)
+
+        # collect the results in group/row order
+        for (group, url_list, deviations, out), futures in zip(
+                task_list, future_list):
+            for start, future in futures:
+                block = future.result()
+                out[start:start + len(block)] = block
+            group_dict[group] = (url_list, out)
+            print('Done with computing scores for ' + group_var + ': ' +
+                  str(group))
+
+    return group_dict
+
+def calculate_group_totals(values):
+    '''
+    Description:
+        This function will compute the running totals needed to derive the
+            mean and standard deviation of every statistic in a group:
+            the sum, the sum of squares and the number of (non-NaN) values.
+            Totals for different sets of players can simply be added to (or
+            subtracted from) each other.
+
+    Input:
+        values (ndarray) - players x stats matrix of raw statistics in which
+            missing values are stored as NaN
+
+    Output:
+        total (ndarray) - sum of every statistic
+        total_sq (ndarray) - sum of squares of every statistic
+        count (ndarray) - number of values for every statistic
+    '''
+    values = np.asarray(values, dtype=np.float64).reshape(-1, np.shape(
+            values)[-1])
+    mask = ~np.isnan(values)
+    values = np.where(mask, values, 0.0)
+    return values.sum(axis=0), (values ** 2).sum(axis=0), mask.sum(axis=0)
+
+def calculate_group_deviations(values, total, total_sq, count, std=None):
+    '''
+    Description:
+        This function will compute the deviation (z-score) of every player's
+            statistics from the group's mean, using the group's running
+            totals to derive the mean and (sample) standard deviation.
+            Statistics with fewer than two values in the group have no
+            standard deviation and every deviation for them is NaN.
+
+    Input:
+        values (ndarray) - players x stats matrix of raw statistics
+        total (ndarray) - sum of every statistic in the group
+        total_sq (ndarray) - sum of squares of every statistic in the group
+        count (ndarray) - number of values for every statistic in the group
+        std (ndarray) - standard deviations to use rather than the group's
+            own (optional)
+
+    Output:
+        deviations (ndarray) - players x stats matrix of deviations
+        std (ndarray) - standard deviation of every statistic in the group
+    '''
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        if std is None:
+            variance = (total_sq - total * mean) / (count - 1)
+            # remove round-off from groups in which every value is the same
+            variance[variance <= 1e-12 * total_sq / count] = 0
+            std = np.where(count > 1, np.sqrt(variance), np.nan)
+
+        diff = values - mean
+        deviations = np.where(std == 0, 0.0, diff / std)
+    deviations[np.isnan(values) | np.isnan(std)] = np.nan
+
+    return deviations, std
+
+def update_group_similarity(playersDF, group_var, stats_list, path_state,
+                            block_size=None, rtol=0):
+    '''
+    Description:
+        This function will compute the similarity score between every pair
+            of players within each group (i.e. age or years of experience),
+            reusing the results of the previous run stored in `path_state`.
+
+        For every group, the players' raw statistics and the players x
+            players matrix of scores are kept on disk.  When the function is
+            run again:
+            * groups in which no player was added, removed or changed are
+                not recomputed at all
+            * the group's means and standard deviations are computed from
+                every season in the group, including the earlier seasons of
+                players with more than one season in it (the same seasons
+                `calculate_deviations` uses), while the scores only use each
+                player's last season (see `split_by_group`)
+            * the distance between two players depends on the group's
+                standard deviations but not on its means (the mean cancels
+                out of the difference), so if the standard deviations did
+                not move (within `rtol`), only the rows and columns of the
+                added/changed players are recomputed; otherwise the whole
+                group is recomputed
+            * the standard deviations saved with a group are the ones its
+                scores were computed with:  rows and columns that are
+                recomputed reuse them, so every score in a matrix is based
+                on the same standard deviations and the tolerance is always
+                measured from them (rather than from the previous run's,
+                which would let the reused scores drift further every run)
+        If no previous state exists, every group is computed from scratch.
+        The score matrices are memory-mapped from their files in
+            `path_state` rather than held in memory, and are written (and
+            their saved scores copied) `block_size` rows at a time, as
+            float32 when a `block_size` is given.
+
+    Input:
+        playersDF (dataframe) - contains the `url`, the group variable and
+            the raw value of every statistic for every player season
+        group_var (string) - name of the variable to group seasons by
+            (i.e. `age` or `years_exp`)
+        stats_list (list) - statistics to include in the deviance
+        path_state (string) - folder in which the state is stored
+        block_size (int) - number of players to score at a time when a
+            group is recomputed (optional)
+        rtol (float) - relative change in a group's standard deviations
+            below which existing scores are reused (default: 0, i.e. any
+            change recomputes the whole group)
+
+    Output:
+        group_dict (dictionary) - keys are every group value (sorted); each
+            value is a tuple of the player urls in that group and the
+            players x players matrix of similarity scores (same order)
+    '''
+    os.makedirs(path_state, exist_ok=True)
+
+    # read in the state saved for every group by the previous run
+    state_dict = {}
+    for file in sorted(os.listdir(path_state)):
+        if file.startswith('state_' + group_var + '_') and file.endswith(
+                '.npz'):
+            with np.load(Path(path_state, file)) as state:
+                state_dict[state['group'].item()] = {
+                        key: state[key] for key in state.files}
+
+    # every season (used for the group totals) and the last season of every
+    #   player (used for the scores) in every group
+    season_dict = split_by_group(playersDF, group_var, stats_list,
+                                 unique=False)
+
+    group_dict = {}
+    for group, (url_list, values) in split_by_group(
+            playersDF, group_var, stats_list).items():
+        path_scores = Path(path_state, 'scores_%s_%s.npy' % (group_var, group))
+        state = state_dict.pop(group, None)
+        total, total_sq, count = calculate_group_totals(season_dict[group][1])
+
+        reuse = False
+        if state is None or state['stats'].tolist() != stats_list:
+            # no usable state: compute the group from scratch
+            deviations, std = calculate_group_deviations(
+                    values, total, total_sq, count)
+        else:
+            # keep the previous order of existing players and add any new
+            #   players to the end of the group
+            url_list_old = state['url'].tolist()
+            index_old = {url: index for index, url in enumerate(url_list_old)}
+            index_new = {url: index for index, url in enumerate(url_list)}
+            kept = [index_old[url] for url in url_list_old if url in index_new]
+            removed = [index_old[url] for url in url_list_old
+                       if url not in index_new]
+            url_list = ([url_list_old[index] for index in kept] +
+                        [url for url in url_list if url not in index_old])
+            values = values[[index_new[url] for url in url_list]]
+
+            # identify existing players whose statistics have changed
+            values_old = state['values'][kept]
+            values_kept = values[:len(kept)]
+            same = ((values_kept == values_old) | (
+                    np.isnan(values_kept) & np.isnan(values_old))).all(axis=1)
+            changed = np.flatnonzero(~same)
+            dirty = np.concatenate([changed, np.arange(
+                    len(kept), len(url_list))]).astype(np.int64)
+
+            # (a change to an earlier season of a player only moves the
+            #   group's standard deviations)
+            deviations, std = calculate_group_deviations(
+                    values, total, total_sq, count)
+            reuse = np.allclose(std, state['std'], rtol=rtol, atol=0,
+                                equal_nan=True)
+            if len(dirty) == 0 and len(removed) == 0 and reuse:
+                group_dict[group] = (url_list, np.load(path_scores,
+                                                       mmap_mode='r'))
+                print('No changes to scores for ' + group_var + ': ' +
+                      str(group))
+                continue
+
+        # write the scores to a memory-mapped file next to the previous ones
+        #   (float32 when scoring in blocks, as in `calculate_group_similarity`)
+        path_temp = Path(str(path_scores) + '.tmp')
+        scores = np.lib.format.open_memmap(
+                str(path_temp), mode='w+', shape=(len(url_list),
+                                                  len(url_list)),
+                dtype=np.float64 if block_size is None else np.float32)
+        step = max(len(url_list), 1) if block_size is None else block_size
+        if not reuse:
+            calculate_pairwise_similarity(deviations, block_size, scores)
+        else:
+            # reuse the scores between players that have not changed
+            #   and only recompute the rows/columns of those that have
+            #   (with the standard deviations the saved scores use), one
+            #   block of rows at a time
+            deviations, std = calculate_group_deviations(
+                    values, total, total_sq, count, state['std'])
+            scores_old = np.load(path_scores, mmap_mode='r')
+            clean = np.setdiff1d(np.arange(len(kept)), changed)
+            clean_old = np.asarray(kept, dtype=np.int64)[clean]
+            for start in range(0, len(clean), step):
+                rows = clean_old[start:start + step]
+                scores[np.ix_(clean[start:start + step], clean)] = (
+                        scores_old[rows][:, clean_old])
+            del scores_old
+            for start in range(0, len(dirty), step):
+                rows = dirty[start:start + step]
+                block = calculate_pairwise_similarity_block(np.vstack(
+                        [deviations[rows], deviations]), 0, len(rows))
+                block = block[:, len(rows):]
+                scores[rows, :] = block
+                scores[:, rows] = block.T
+
+        # store the state for the next run
+        scores.flush()
+        del scores
+        os.replace(path_temp, path_scores)
+        scores = np.load(path_scores, mmap_mode='r')
+        np.savez(Path(path_state, 'state_%s_%s.npz' % (group_var, group)),
+                 group=np.array(group), url=np.array(url_list),
+                 stats=np.array(stats_list), values=values, std=std)
+        group_dict[group] = (url_list, scores)
+        print('Done with computing scores for ' + group_var + ': ' +
+              str(group))
+
+    # remove the state of any groups that no longer exist
+    for group in state_dict.keys():
+        for file in ['state_%s_%s.npz' % (group_var, group),
+                     'scores_%s_%s.npy' % (group_var, group)]:
+            if os.path.exists(Path(path_state, file)):
+                os.remove(Path(path_state, file))
+
+    return group_dict
+
+def check_update_similarity(playersDF, changedDF, group_var, stats_list,
+                            block_size=None, rtol=0):
+    '''
+    Description:
+        This function will check the incremental mode against the full
+            computation:  the scores of `playersDF` are saved to a temporary
+            state folder with `update_group_similarity`, updated with the
+            seasons in `changedDF`, and compared to the scores computed from
+            scratch for `changedDF` (`calculate_deviations` followed by
+            `calculate_group_similarity`).
+        With an `rtol` of 0 the two should only differ by round-off; with a
+            larger `rtol` the reused scores may differ by as much as a
+            change of `rtol` in the standard deviations allows.
+
+    Input:
+        playersDF (dataframe) - player seasons of the previous run
+        changedDF (dataframe) - player seasons of the current run (i.e.
+            with seasons added, removed or changed)
+        group_var (string) - name of the variable to group seasons by
+        stats_list (list) - statistics to include in the deviance
+        block_size (int) - number of players to score at a time (optional)
+        rtol (float) - see `update_group_similarity` (default: 0)
+
+    Output:
+        max_diff (float) - largest absolute difference between the scores
+            of the two modes (infinite if their groups, players or missing
+            scores do not match)
+    '''
+    group_dict_full = calculate_group_similarity(calculate_deviations(
+            changedDF, group_var, stats_list), group_var, stats_list,
+            block_size)
+    with tempfile.TemporaryDirectory() as path_state:
+        update_group_similarity(playersDF, group_var, stats_list, path_state,
+                                block_size, rtol)
+        group_dict_update = update_group_similarity(
+                changedDF, group_var, stats_list, path_state, block_size,
+                rtol)
+
+        if list(group_dict_full) != list(group_dict_update):
+            return np.inf
+        max_diff = 0.0
+        for group, (url_list, scores) in group_dict_full.items():
+            url_list_update, scores_update = group_dict_update[group]
+            if sorted(url_list) != sorted(url_list_update):
+                return np.inf
+            # put the updated scores in the same order as the full scores
+            index = {url: i for i, url in enumerate(url_list_update)}
+            order = [index[url] for url in url_list]
+            scores_update = np.asarray(scores_update)[np.ix_(order, order)]
+            scores = np.asarray(scores)
+            if (np.isnan(scores) != np.isnan(scores_update)).any():
+                return np.inf
+            if len(url_list) > 0:
+                max_diff = max(max_diff, float(np.nanmax(np.abs(
+                        scores - scores_update), initial=0)))
+        # release the memory-mapped scores before the folder is removed
+        del group_dict_update, scores_update
+
+    return max_diff
+
+def calculate_similarity_summary(group_dict, url_list, block_size=None):
+    '''
+    Description:
+        This function will condense the group similarity scores between
+            every pair of players into one mean and one median score
+            (computed across all groups the two players have in common).
+        Players are processed `block_size` at a time and each block is
+            yielded as soon as it is complete, so only the scores for one
+            block of players are ever collected at once.
+        For every block, the mean is computed from a running sum and count
+            of the scores in each group, while the median is computed by
+            stacking the block's scores from every group into one
+            groups x players x players array and reducing it with
+            `nanmedian` (groups a pair does not share are left as NaN).
+
+    Input:
+        group_dict (dictionary) - output of `calculate_group_similarity`
+        url_list (list) - every player url, in the desired output order
+        block_size (int) - number of players to summarize at a time
+            (optional, all players at once by default)
+
+    Output:
+        (generator) - yields a tuple of three dataframes for every block of
+            players: the mean scores, the median scores and the number of
+            groups (seasons) the two players have in common.  Rows are the
+            players in the block, columns are every player in `url_list`.
+            Players who share no group with anyone are dropped.
+    '''
+    url_index = {url: index for index, url in enumerate(url_list)}
+
+    # for every group, map the global player index to the row in the group
+    group_list = []
+    for url_list_group, scores in group_dict.values():
+        rows = np.full(len(url_list), -1, dtype=np.int64)
+        columns = np.array([url_index[url] for url in url_list_group],
+                           dtype=np.int64)
+        rows[columns] = np.arange(len(url_list_group))
+        group_list.append((rows, columns, scores))
+
+    if block_size is None:
+        block_size = max(len(url_list), 1)
+
+    for start in range(0, len(url_list), block_size):
+        stop = min(start + block_size, len(url_list))
+
+        # only the groups that contain a player in the block are stacked
+        block_group_list = [(rows[start:stop], columns, scores)
+                            for rows, columns, scores in group_list
+                            if (rows[start:stop] >= 0).any()]
+
+        block_total = np.zeros((stop - start, len(url_list)))
+        block_count = np.zeros((stop - start, len(url_list)), dtype=np.int64)
+        block_stack = np.full((len(block_group_list), stop - start,
+                               len(url_list)), np.nan)
+
+        for index, (rows, columns, scores) in enumerate(block_group_list):
+            players = np.flatnonzero(rows >= 0)
+            cells = np.ix_(players, columns)
+            block_scores = scores[rows[players]]
+            block_total[cells] += block_scores
+            block_count[cells] += 1
+            block_stack[index][cells] = block_scores
+
+        # don't include player's scores with self
+        players = np.arange(stop - start)
+        block_count[players, start + players] = 0
+        block_stack[:, players, start + players] = np.nan
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            block_mean = np.where(block_count > 0,
+                                  block_total / block_count, np.nan)
+        with warnings.catch_warnings():
+            # pairs that share no group are all-NaN slices and stay NaN
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            if len(block_group_list) > 0:
+                block_median = np.nanmedian(block_stack, axis=0)
+            else:
+                block_median = np.full(block_mean.shape, np.nan)
+
+        meanDF = pd.DataFrame(block_mean, index=url_list[start:stop],
+                              columns=url_list).dropna(how='all')
+        medianDF = pd.DataFrame(block_median, index=url_list[start:stop],
+                                columns=url_list).loc[meanDF.index]
+        countDF = pd.DataFrame(block_count, index=url_list[start:stop],
+                               columns=url_list).loc[meanDF.index]
+        print('Done summarizing scores for ' + str(stop) + ' players')
+
+        yield meanDF, medianDF, countDF
+
+def write_similarity_summary(group_dict, url_list, path_mean, path_median,
+                             block_size=None):
+    '''
+    Description:
+        This function will write the mean and median similarity scores
+            between every pair of players to CSV files one block of players
+            at a time.
+        Note:  The score matrices are symmetric, so each block of rows
+            written here matches the corresponding columns of the original
+            (player per column) output.
+
+    Input:
+        group_dict (dictionary) - output of `calculate_group_similarity`
+        url_list (list) - every player url, in the desired output order
+        path_mean (string) - path of the CSV file for the mean scores
+        path_median (string) - path of the CSV file for the median scores
+        block_size (int) - number of players to write at a time (optional)
+
+    Output:
+        None
+    '''
+    first = True
+    for meanDF, medianDF, countDF in calculate_similarity_summary(
+            group_dict, url_list, block_size):
+        mode = 'w' if first else 'a'
+        meanDF.to_csv(path_mean, mode=mode, header=first)
+        medianDF.to_csv(path_median, mode=mode, header=first)
+        first = False
+
+def write_similarity_neighbors(group_dict, url_list, path_neighbors, top_k,
+                               block_size=None, rank_by='mean'):
+    '''
+    Description:
+        This function will write each player's `top_k` most similar players
+            to a CSV file rather than the full player x player matrices.
+            The neighbors of a whole block of players are picked at once as
+            their scores are summarized:  a partition finds every player's
+            `top_k`-th highest score, the scores above it (plus the earliest
+            players tied with it) are kept and only those candidates are
+            sorted, so only the closest comparables are ever retained.
+
+        The resulting table contains one row per player/neighbor pair:
+            * url: the player's url
+            * url_neighbor: the comparable player's url
+            * mean: mean similarity score across all shared seasons
+            * median: median similarity score across all shared seasons
+            * shared_seasons: number of seasons (groups) in common
+
+    Input:
+        group_dict (dictionary) - output of `calculate_group_similarity`
+        url_list (list) - every player url, in the desired output order
+        path_neighbors (string) - path of the CSV file for the neighbor table
+        top_k (int) - number of comparable players to keep for every player
+        block_size (int) - number of players to process at a time (optional)
+        rank_by (string) - score used to rank neighbors (`mean` or `median`)
+
+    Output:
+        None
+    '''
+    first = True
+    for meanDF, medianDF, countDF in calculate_similarity_summary(
+            group_dict, url_list, block_size):
+        scores = (meanDF if rank_by == 'mean' else medianDF).to_numpy()
+        valid = ~np.isnan(scores)
+        scores = np.where(valid, scores, -np.inf)
+
+        # find every player's `top_k`-th highest score and keep the scores
+        #   above it, along with as many of the scores tied with it as are
+        #   needed (ties go to the earlier player)
+        k = min(top_k, scores.shape[1])
+        if k > 0:
+            threshold = -np.partition(-scores, k - 1, axis=1)[:, [k - 1]]
+            above = valid & (scores > threshold)
+            tied = valid & (scores == threshold)
+            needed = k - above.sum(axis=1, keepdims=True)
+            keep = above | (tied & (np.cumsum(tied, axis=1) <= needed))
+        else:
+            keep = np.zeros(scores.shape, dtype=bool)
+
+        # sort every player's candidates by score (highest first)
+        rows, columns = np.nonzero(keep)
+        order = np.lexsort((columns, -scores[rows, columns], rows))
+        rows, columns = rows[order], columns[order]
+        neighborDF = pd.DataFrame({
+                'url': meanDF.index.to_numpy(dtype=object)[rows],
+                'url_neighbor': np.asarray(url_list, dtype=object)[columns],
+                'mean': meanDF.to_numpy()[rows, columns],
+                'median': medianDF.to_numpy()[rows, columns],
+                'shared_seasons': countDF.to_numpy()[rows, columns]},
+                columns=['url', 'url_neighbor', 'mean', 'median',
+                         'shared_seasons'])
+        neighborDF.to_csv(path_neighbors, mode='w' if first else 'a',
+                          header=first, index=False)
+        first = False
+
+def write_similarity_scores(group_dict, url_list, folder, name,
+                            block_size=None, top_k=None):
+    '''
+    Description:
+        This function will write the similarity scores between players to
+            CSV files in the specified folder:
+            * <name>_similarity_scores_mean.csv and
+                <name>_similarity_scores_median.csv (full matrices), or
+            * <name>_similarity_neighbors.csv if `top_k` is specified
+
+    Input:
+        group_dict (dictionary) - output of `calculate_group_similarity`
+        url_list (list) - every player url, in the desired output order
+        folder (string) - folder in which to write the files
+        name (string) - prefix of the files (i.e. `WIDE_RECEIVER_exp`)
+        block_size (int) - number of players to write at a time (optional)
+        top_k (int) - number of comparable players to keep for every player
+            (optional)
+
+    Output:
+        None
+    '''
+    if top_k is not None:
+        write_similarity_neighbors(group_dict, url_list, Path(
+                folder, name + '_similarity_neighbors.csv'), top_k,
+                block_size)
+    else:
+        write_similarity_summary(group_dict, url_list,
+                                 Path(folder, name +
+                                      '_similarity_scores_mean.csv'),
+                                 Path(folder, name +
+                                      '_similarity_scores_median.csv'),
+                                 block_size)
+
+def calculate_ensemble_summary(group_dict_list, url_list, block_size=None):
+    '''
+    Description:
+        This function will combine the similarity scores of several
+            groupings (i.e. by age and by years of experience) into one
+            "ensemble" mean and median score between every pair of players:
+            the average of the mean (median) scores of every grouping.
+        The summaries of every grouping are computed in lockstep, one block
+            of players at a time, and averaged in memory on the players'
+            position in `url_list`, so no score matrix is ever reread from
+            disk.
+
+    Input:
+        group_dict_list (list) - outputs of `calculate_group_similarity`
+            (one per grouping)
+        url_list (list) - every player url, in the desired output order
+        block_size (int) - number of players to summarize at a time
+            (optional, all players at once by default)
+
+    Output:
+        (generator) - yields a tuple of two dataframes for every block of
+            players: the ensemble mean scores and the ensemble median scores
+            (groupings in which a pair has no score are ignored)
+    '''
+    url_index = {url: index for index, url in enumerate(url_list)}
+    summary_list = [calculate_similarity_summary(group_dict, url_list,
+                                                 block_size)
+                    for group_dict in group_dict_list]
+
+    for block_list in zip(*summary_list):
+        # players without a score in one grouping may have one in another
+        index_list = set()
+        for meanDF, medianDF, countDF in block_list:
+            index_list.update(meanDF.index)
+        index_list = sorted(index_list, key=url_index.get)
+
+        with warnings.catch_warnings():
+            # pairs without a score in any grouping stay NaN
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            block_mean = np.nanmean([meanDF.reindex(index_list).to_numpy()
+                                     for meanDF, _, _ in block_list], axis=0)
+            block_median = np.nanmean([
+                    medianDF.reindex(index_list).to_numpy()
+                    for _, medianDF, _ in block_list], axis=0)
+
+        yield (pd.DataFrame(block_mean, index=index_list, columns=url_list),
+               pd.DataFrame(block_median, index=index_list, columns=url_list))
+
+def write_similarity_ensemble(group_dict_list, url_list, folder, name,
+                              block_size=None):
+    '''
+    Description:
+        This function will write the ensemble mean and median similarity
+            scores (see `calculate_ensemble_summary`) to the CSV files
+            <name>_similarity_scores_mean_ensemble.csv and
+            <name>_similarity_scores_median_ensemble.csv in the specified
+            folder, one block of players at a time.
+
+    Input:
+        group_dict_list (list) - outputs of `calculate_group_similarity`
+            (one per grouping)
+        url_list (list) - every player url, in the desired output order
+        folder (string) - folder in which to write the files
+        name (string) - prefix of the files (i.e. `WIDE_RECEIVER`)
+        block_size (int) - number of players to write at a time (optional)
+
+    Output:
+        None
+    '''
+    path_mean = Path(folder, name + '_similarity_scores_mean_ensemble.csv')
+    path_median = Path(folder, name +
+                       '_similarity_scores_median_ensemble.csv')
+
+    first = True
+    for meanDF, medianDF in calculate_ensemble_summary(
+            group_dict_list, url_list, block_size):
+        mode = 'w' if first else 'a'
+        meanDF.to_csv(path_mean, mode=mode, header=first)
+        medianDF.to_csv(path_median, mode=mode, header=first)
+        first = False
+
+#==============================================================================
+# Position Profiles
+#==============================================================================
+# Statistics used to compare players at each position:
+#   * fill_list - stat prefixes whose missing values are replaced with 0's
+#   * stats_list - stats used for comparison (along with every combine stat)
+STAT_PROFILES = {
+        'WIDE_RECEIVER': {
+                'fill_list': ['fumbles', 'kick_return', 'punt_return',
+                              'receiving', 'rushing'],
+                'stats_list': ['receiving_g',
+                               'receiving_rec',
+                               'receiving_yds',
+                               'receiving_td',
+                               'receiving_20+',
+                               'receiving_40+',
+                               'receiving_1st',
+                               'receiving_fum']},
+        'QUARTERBACK': {
+                'fill_list': ['fumbles', 'kick_return', 'punt_return',
+                              'receiving', 'rushing'],
+                'stats_list': ['passing_pct',
+                               'passing_td%',
+                               'passing_avg',
+                               'passing_int%',
+                               'passing_comp',
+                               'passing_att',
+                               'passing_yds']},
+        }
+
+# Variables that seasons can be grouped by, along with the suffix used in
+#   the names of the output files
+GROUP_VARS = {'age': '_age', 'years_exp': '_exp'}
+
+def get_stat_profile(position):
+    '''
+    Description:
+        This function will return the stat profile of a position, falling
+            back to the wide receiver profile for positions without one.
+
+    Input:
+        position (string) - position group (i.e. `QUARTERBACK`)
+
+    Output:
+        profile (dictionary) - see `STAT_PROFILES`
+    '''
+    return STAT_PROFILES.get(position, STAT_PROFILES['WIDE_RECEIVER'])
+
+def load_position(folder, position, profile):
+    '''
+    Description:
+        This function will read the statistics of a position group from its
+            CSV file, replace missing values with 0's for the stats in the
+            profile's `fill_list` and identify the stats to compare players
+            on (every combine stat plus the profile's `stats_list`).
+
+    Input:
+        folder (string) - folder containing the position's CSV file
+        position (string) - position group (i.e. `WIDE_RECEIVER`)
+        profile (dictionary) - stat profile to use (see `STAT_PROFILES`)
+
+    Output:
+        playersDF (dataframe) - contains all player information and
+            statistical information for the position
+        stats_list (list) - statistics to compare players on
+    '''
+    # Specify dtypes for specific columns that will give warnings without it
+    playersDF = pd.read_csv(Path(folder, position + '.csv'), dtype = {
+            'team_pic_url': str, 'high_school_state':str})
+
+    # Identify the columns we want to fill in missing values for and replace
+    #   them with 0's
+    fill_list = [col for col in playersDF.columns if col.startswith(
+            tuple(profile['fill_list']))]
+    playersDF[fill_list] = playersDF[fill_list].fillna(0)
+
+    # Identify the stats we want to use for comparison purposes
+    stats_list = []
+    for col in playersDF.columns:
+        if col.startswith('combine') and (
+                col not in ['combine_url', 'combine_draftYear']):
+            stats_list.append(col)
+        elif col in profile['stats_list']:
+            stats_list.append(col)
+
+    return playersDF, stats_list
+
+def analyze_position(folder, position, group_var_list=None, profile=None,
+                     block_size=None, path_memmap=None, top_k=None,
+                     workers=1, path_state=None, rtol=0, ensemble=False):
+    '''
+    Description:
+        This function will calculate the similarity scores between every
+            player of a position group for every requested grouping variable
+            (i.e. `age` and `years_exp`) and write them to CSV files in the
+            position's folder.  The position's CSV file is read only once and
+            the deviations and scores of every grouping are kept so that they
+            can be reused (i.e. to build an ensemble).  The scores are kept
+            in memory unless a `path_memmap` folder is given (or they are
+            updated from a previous run), in which case they are
+            memory-mapped from files in that folder.
+        If `ensemble` is True, the scores of every grouping are also averaged
+            into one set of ensemble scores for the position (only written
+            when full matrices are output, i.e. `top_k` is not specified).
+
+    Input:
+        folder (string) - folder containing the position's CSV file (files
+            are also output here)
+        position (string) - position group (i.e. `WIDE_RECEIVER`)
+        group_var_list (list) - grouping variables to score the position by
+            (default: every variable in `GROUP_VARS`)
+        profile (dictionary) - stat profile to use (default: the position's
+            profile, see `get_stat_profile`)
+        block_size (int) - number of players to score/write at a time
+            (optional)
+        path_memmap (string) - folder (within `folder`) for memory-mapped
+            score matrices (optional, see `calculate_group_similarity`; not
+            used with `path_state`, whose folder holds the matrices)
+        top_k (int) - number of comparable players to write for every player
+            rather than the full matrices (optional)
+        workers (int) - number of processes used to compute the similarity
+            scores (default: 1)
+        path_state (string) - folder (within `folder`) holding the results
+            of the previous run, so that only changed scores are recomputed
+            (optional, see `update_group_similarity`)
+        rtol (float) - relative change in a group's standard deviations
+            below which the scores of unchanged players are reused when
+            updating from a previous run (default: 0, i.e. any change
+            recomputes the whole group)
+        ensemble (boolean) - write the ensemble scores (default: False)
+
+    Output:
+        result_dict (dictionary) - keys are the grouping variables; each
+            value is a tuple of the url list (output order), the deviations
+            (None when updating from a previous run) and the group_dict of
+            similarity scores
+    '''
+    if group_var_list is None:
+        group_var_list = list(GROUP_VARS)
+    if profile is None:
+        profile = get_stat_profile(position)
+
+    playersDF, stats_list = load_position(folder, position, profile)
+    url_list = playersDF['url'].value_counts().sort_index().index.tolist()
+
+    result_dict = {}
+    for group_var in group_var_list:
+        print('Scoring ' + position + ' by ' + group_var)
+        if path_state is not None:
+            # Update the similarity scores from the previous run's results
+            devianceDF = None
+            group_dict = update_group_similarity(
+                    playersDF, group_var, stats_list,
+                    Path(folder, path_state), block_size, rtol)
+        else:
+            # Calculate the "deviance" for each player across every season
+            #   relative to all other seasons in the same group
+            devianceDF = calculate_deviations(playersDF, group_var,
+                                              stats_list)
+            group_dict = calculate_group_similarity(
+                    devianceDF, group_var, stats_list, block_size,
+                    None if path_memmap is None else Path(folder,
+                                                          path_memmap),
+                    workers)
+
+        # collapse the data such that each player has a link to every other
+        #   player along with the mean/median of their respective scores for
+        #   every group they have in common and output it to CSV files
+        write_similarity_scores(group_dict, url_list, folder,
+                                position + GROUP_VARS[group_var], block_size,
+                                top_k)
+        result_dict[group_var] = (url_list, devianceDF, group_dict)
+
+    if ensemble and top_k is None:
+        print('Creating ensemble scores for ' + position)
+        write_similarity_ensemble([group_dict for _, _, group_dict in
+                                   result_dict.values()], url_list, folder,
+                                  position, block_size)
+
+    return result_dict
+
+def analyze_positions(path_stats, position_list=None, **kwargs):
+    '''
+    Description:
+        This function will run `analyze_position` for every position folder
+            in the specified folder.
+
+    Input:
+        path_stats (string) - folder containing one folder per position
+            (i.e. `Data/PlayerStats`)
+        position_list (list) - positions to process (default: every folder)
+        **kwargs - passed on to `analyze_position`
+
+    Output:
+        position_dict (dictionary) - keys are the positions; values are the
+            output of `analyze_position`
+    '''
+    if position_list is None:
+        position_list = sorted(f.name for f in os.scandir(path_stats)
+                               if f.is_dir())
+
+    position_dict = {}
+    for position in position_list:
+        position_dict[position] = analyze_position(
+                Path(path_stats, position), position, **kwargs)
+
+    return position_dict
+
+#==============================================================================
+# Working Code
+#==============================================================================
+if __name__ == '__main__':
+    # Check the incremental mode (`path_state`) against the full computation
+    #   on random player seasons (including players with more than one season
+    #   in a group, i.e. multi-team seasons) in which seasons are then added,
+    #   removed and changed
+    rng = np.random.default_rng(0)
+    stats_list = ['stat_' + str(i) for i in range(5)]
+    playersDF = pd.DataFrame(rng.normal(50, 10, (400, len(stats_list))),
+                             columns=stats_list)
+    playersDF[stats_list] = playersDF[stats_list].mask(
+            rng.random(playersDF[stats_list].shape) < 0.1)
+    playersDF.insert(0, 'age', rng.integers(21, 26, len(playersDF)))
+    playersDF.insert(0, 'url', ['player_' + str(i) for i in rng.integers(
+            0, 250, len(playersDF))])
+
+    changedDF = playersDF.drop(index=rng.choice(len(playersDF), 5,
+                                                replace=False))
+    changedDF = pd.concat([changedDF, playersDF.sample(
+            5, random_state=1).assign(url=lambda x: x['url'] + '_new')])
+    changed = rng.choice(len(changedDF), 10, replace=False)
+    changedDF.iloc[changed, 2] = changedDF.iloc[changed, 2] + 1
+
+    for block_size in [None, 100]:
+        max_diff = check_update_similarity(playersDF, changedDF, 'age',
+                                           stats_list, block_size)
+        print('Largest difference between the full and incremental scores '
+              '(block size ' + str(block_size) + '): ' + str(max_diff))
+        # (scores are stored as float32 when a block size is given)
+        if not max_diff < (1e-6 if block_size is None else 1e-3):
+            raise AssertionError('The incremental scores do not match the '
+                                 'full computation')
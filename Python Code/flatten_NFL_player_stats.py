@@ -22,10 +22,6 @@ Created on Thu May 24 12:54:49 2018
             script treats the Cleveland line as 2016 and then duplicates the 
             2009 season with Tennessee twice.  
         # Need to correct this by grouping by year and combining to one line
-        
-    - When correcting for multiple teams in the same year, entries do not
-        account for the calculations needed for stat categories such as
-        Avg, Long, Pct, etc.. for positions other than Wide Receiver
    
 :TODO:
 """
@@ -37,9 +33,15 @@ import copy
 from datetime import datetime
 import json
 import math
+import numpy as np
 import os
 from pathlib import Path
 import pandas as pd
+from player_join import (build_player_index, join_player_records, 
+                         load_draft_index)
+from player_stats_store import (list_position_years, load_position_stats,
+                                position_store_current)
+from school_names import load_alias_map, standardize_names
 
 #==============================================================================
 # Function Definitions / Reference Variable Declaration
@@ -65,34 +67,24 @@ def update_draft_info(player_list):
     
     Input:
         player_list (list) - contains all scraped player info from NFL.com
-        draft_list (list) - contains information on players drafted since 1970
         
     Output:
         final_list (list) - contains all player stat information along with
             updated draft information
     '''
-    # read in the historic draft data
-    with open(Path('Data', 'Draft', 'historic_draft_data.json'), 'r') as f:
-        draft_list = json.load(f)
+    # read in the index of the historic draft data (built from and saved
+    #   next to `historic_draft_data.json`)
+    draft_index = load_draft_index(Path('Data', 'Draft', 
+                                        'historic_draft_data.json'))
 
-    # iterate over every player in the player list and update their information
-    #   with information obtained from the draft_list
-    for player in player_list:
-        # find a matching player in draft_list based on:
-        #   player_list:  name_first, name_last, college
-        #   draft_list:  nameFirst, nameLast, school
-        # Once a player is found, extract their draft info and add it to
-        #   the player's historic information and stop the for loop so that
-        #   the next player can be updated
-        for pick in draft_list:
-            if (player['name_first'] == pick['nameFirst'] 
-            and player['name_last'] == pick['nameLast'] 
-            and player['college'].split(' ')[0] == pick['school'].split(' ')[0]):
-                player['draft_pick_overall'] = pick['overall']
-                player['draft_pick_round'] = pick['pick']
-                player['draft_round'] = pick['round']
-                player['draft_team'] = pick['team']
-                break
+    # update every player's information with information obtained from the 
+    #   draft data by finding the pick matching the player's name_first, 
+    #   name_last and college
+    matched, missed = join_player_records(player_list, draft_index, [
+            ('draft_pick_overall', 'overall'), ('draft_pick_round', 'pick'),
+            ('draft_round', 'round'), ('draft_team', 'team')])
+    print('Draft info matched for ' + str(matched) + ' players (' + 
+          str(missed) + ' not found)')
     return player_list
 
 def merge_combine_data(list_of_players):
@@ -128,176 +120,210 @@ def merge_combine_data(list_of_players):
                    'combine_vert', 'combine_broad', 'combine_cone', 
                    'combine_shuttle_20', 'combine_shuttle_60', 'combine_url']
     
-    # for every player in the list, match that player with his combine data
-    #   and add that data to the player's record
-    for player in list_of_players:
-        for info in combine_list:
-            if ((player['name_first'] == info['nameFirst']) 
-            and (player['name_last'] == info['nameLast']) 
-            and (player['college'].split(' ')[0] == info['college'].split(' ')[0])):
-                for a, b in zip(player_vars, combine_vars):
-                    player[a] = info[b]
-                break
+    # index the combine data by player, then match every player with his
+    #   combine data (once per player) and add that data to all of the 
+    #   player's records
+    combine_index = build_player_index(combine_list, 'nameFirst', 'nameLast', 
+                                       'college')
+    matched, missed = join_player_records(list_of_players, combine_index, 
+                                          list(zip(player_vars, combine_vars)))
+    print('Combine data matched for ' + str(matched) + ' players (' + 
+          str(missed) + ' not found)')
     return list_of_players
 
-def combine_multiyear_stats(annual_list):
+# derived (rate) stats and how they are recalculated from the summed stats
+#   of a season:  (numerator, denominator, multiplier)
+rate_stats = {'passing_avg': ('passing_yds', 'passing_att', 1),
+              'passing_att/g': ('passing_att', 'passing_g', 1),
+              'passing_yds/g': ('passing_yds', 'passing_g', 1),
+              'passing_pct': ('passing_comp', 'passing_att', 100),
+              'passing_td%': ('passing_td', 'passing_att', 100),
+              'passing_int%': ('passing_int', 'passing_att', 100),
+              'rushing_avg': ('rushing_yds', 'rushing_att', 1),
+              'rushing_att/g': ('rushing_att', 'rushing_g', 1),
+              'rushing_yds/g': ('rushing_yds', 'rushing_g', 1),
+              'rushing_1st%': ('rushing_1st', 'rushing_att', 100),
+              'receiving_avg': ('receiving_yds', 'receiving_rec', 1),
+              'receiving_yds/g': ('receiving_yds', 'receiving_g', 1),
+              'kick_return_avg': ('kick_return_yds', 'kick_return_ret', 1),
+              'punt_return_avg': ('punt_return_rety', 'punt_return_ret', 1),
+              }
+
+# markers of derived stats (any derived stat without an entry in 
+#   `rate_stats` is recalculated as an average weighted by games played)
+rate_markers = ['avg', 'pct', '%', '/g', 'rate']
+
+def calculate_passer_rating(comp, att, yds, td, interceptions):
+    '''
+    Description:
+        This function calculates the NFL passer rating.
+    
+    Input:
+        comp (series) - completions
+        att (series) - pass attempts
+        yds (series) - passing yards
+        td (series) - passing touchdowns
+        interceptions (series) - interceptions thrown
+        
+    Output:
+        rating (series) - passer rating (0 if there were no attempts)
+    '''
+    att = att.where(att > 0)
+    components = [((comp / att) - 0.3) * 5, 
+                  ((yds / att) - 3) * 0.25, 
+                  (td / att) * 20, 
+                  2.375 - ((interceptions / att) * 25)]
+    rating = sum([c.clip(lower = 0, upper = 2.375) for c in components])
+    return (rating / 6 * 100).fillna(0)
+
+def combine_multiyear_stats(annualDF, player_var='player_index'):
     '''
     Description:
         This function accounts for cases in which players play for multiple
         teams within the same season.  To account for this, all stats in the
         same season will be summed together to form singular values.  The
         player's team for that season will be whatever team they last played
-        for in that season.
+        for in that season (i.e. the first row of that season).
+
+        All seasons of all players are combined at once by grouping the rows
+        by player and year:
+            - counting stats (yards, touchdowns, etc.) are summed
+            - `lng` stats take the maximum value
+            - derived stats (averages, percentages, per game stats, passer
+                rating) are recalculated from the summed stats (see 
+                `rate_stats`) and rounded to one decimal like NFL.com
+        Seasons played for a single team are left untouched.
     
     Input:
-        annual_list (list) - contains all career stat player info from NFL.com
-            for a specific player
+        annualDF (dataframe) - contains the career stats from NFL.com (one 
+            row per player per team per year) with a `player_var` column
+            identifying the player of every row
+        player_var (string) - variable identifying the player of a row
         
     Output:
-        final_list (list) - contains all player stat information that has
-            been compressed/rolled up such that there is only one record (row)
-            per player per year
+        annualDF (dataframe) - contains the career stats with only one row 
+            per player per year (in the order of the input rows)
     '''
-#   Edge case for checking data in multiple years
-#   annual_list = stat_list[469]['stats_annual']
-    annual_list = stats_annual
-    annualDF = pd.DataFrame(annual_list)
-    try:
-        year_count = annualDF['year'].value_counts()
-    except:
-        return []
+    group_vars = [player_var, 'year']
+    season_size = annualDF.groupby(group_vars, sort=False)['year'].transform(
+            'size')
+    multiDF = annualDF[season_size > 1]
+    if len(multiDF) == 0:
+        return annualDF
+    groups = multiDF.groupby(group_vars, sort=False)
     
-    # If there exists more than one row per year, combine the results of those
-    #   rows such that there is only one row per year
-    final_list = []
-    for index, count in year_count.iteritems():
-        if int(count) > 1:
-            # extract the data for those rows
-            years_dict = annualDF[annualDF['year'] == index].to_dict()
-            
-            # start combining the data for those rows in a new dict
-            #   All stats can be summed together with the exception of the 
-            #   following values:  
-            #       Receiving: `Avg`, `Yds/G`, `Lng`
-            #       Rushing: `Att/G`, `Avg`, `Yds/G`, `Lng`, `1st%`
-            #       Returns: `Avg`, `Lng`
-            #       Defensive: `Avg`, `Lng`
-            #       Fumbles: ----
-            #       Passing: `Pct`, `Att/G`, `Avg`, `Yds/G`, `TD%`, `Int%`, 
-            #                `Lng`, `Rate`
-            #       Punting: `Lng`, `Avg`, `Net Avg`
-            #       Kickoff: `Avg`, `Pct`, `Avg`  
-            #       Field Goal: `Lng`, `Pct`, `Pct`, `Pct`, `Pct`, `Pct`, `Pct`
-            temp_dict = {}
+    # identify how every variable is combined
+    first_vars = [col for col in multiDF.columns if col not in group_vars 
+                  and not pd.api.types.is_numeric_dtype(multiDF[col])]
+    stat_vars = [col for col in multiDF.columns if col not in group_vars
+                 and col not in first_vars]
+    max_vars = [col for col in stat_vars if 'lng' in col]
+    derived_vars = [col for col in stat_vars if col not in max_vars 
+                    and any(marker in col for marker in rate_markers)]
+    sum_vars = [col for col in stat_vars if col not in max_vars + derived_vars]
+    
+    # combine the counting stats, the `lng` stats and the team
+    combinedDF = pd.concat([groups[first_vars].first(), 
+                            groups[sum_vars].sum(min_count=1), 
+                            groups[max_vars].max()], axis=1)
+    
+    # recalculate the derived stats
+    for col in derived_vars:
+        if col in rate_stats:
+            numerator, denominator, multiplier = rate_stats[col]
+            total = combinedDF[denominator].astype(float)
+            value = (combinedDF[numerator] / total.where(total != 0) * 
+                     multiplier).fillna(0)
+        elif col == 'passing_rate':
+            value = calculate_passer_rating(
+                    *[combinedDF['passing_' + stat].astype(float) for stat in 
+                      ['comp', 'att', 'yds', 'td', 'int']])
+        else:
+            games = col.rsplit('_', 1)[0] + '_g'
+            if games in sum_vars:
+                weight = multiDF[games].fillna(0)
+            else:
+                weight = pd.Series(1, index=multiDF.index)
+            total = (multiDF[col] * weight).groupby([
+                    multiDF[var] for var in group_vars], sort=False).sum()
+            value = total / weight.groupby([multiDF[var] for var in 
+                    group_vars], sort=False).sum().replace(0, float('nan'))
+            value = value.fillna(0)
+        # round like NFL.com (per game stats round half to even, other 
+        #   stats round half away from zero) and only give the derived stat 
+        #   to seasons with the stat category
+        value = value.astype(float)
+        if '/g' in col:
+            value = value.round(1)
+        else:
+            value = np.sign(value) * np.floor(value.abs()*10 + 0.5 + 1e-9)/10
+        value[groups[col].count() == 0] = float('nan')
+        combinedDF[col] = value
+    
+    # replace the rows of every multi-team season with its combined row 
+    #   (placed where the season's first row was)
+    combinedDF = combinedDF.reset_index()[annualDF.columns]
+    combinedDF.index = groups.head(1).index
+    return pd.concat([annualDF[season_size == 1], combinedDF]).sort_index()
 
-            for entry in years_dict:
-                # Determine what stat category we're dealing with so we know
-                #    what values to use for calculations
-                if 'return' in entry:
-                    category = '_'.join(entry.split('_')[0:2])
-                else:
-                    category = entry.split('_')[0]
-                    
-                # set variables names to be used for stat calculations
-                att = ''         
-                g = category + '_g'
-                first = category + '_1st'
-                yds = category + '_yds'
-                comp = category + '_comp'   
-                INT = '_int'
-                td = '_td'
-                if 'return' in category:
-                    att = category + '_ret'
-                elif category == 'receiving': 
-                    att = category + '_rec'
-                elif category == 'rushing':
-                    att = category + '_att'
-                elif category == 'passing':
-                    att = category + '_att'
-                    INT = category + '_int'
-                    td = category + '_td'
+def create_annual_frame(stat_list):
+    '''
+    Description:
+        This function places the career stats of every player of a position
+            into one table.  Stats that only ever contain whole numbers are
+            kept as (nullable) integers.
+    
+    Input:
+        stat_list (list) - contains all scraped player info from NFL.com
+        
+    Output:
+        annualDF (dataframe) - contains one row per player per team per year
+            along with a `player_index` column identifying the position of
+            the player in `stat_list`
+    '''
+    record_list = []
+    float_vars = set()
+    for index, player in enumerate(stat_list):
+        if player is None:
+            continue
+        for season in player.get('stats_annual', []):
+            record = {'player_index': index}
+            record.update(season)
+            record_list.append(record)
+            float_vars.update([key for key, value in season.items() 
+                               if isinstance(value, float)])
+    
+    if len(record_list) == 0:
+        return pd.DataFrame(columns = ['player_index', 'year'])
+    
+    annualDF = pd.DataFrame(record_list)
+    for col in annualDF.columns:
+        if col not in float_vars and pd.api.types.is_numeric_dtype(
+                annualDF[col]):
+            annualDF[col] = annualDF[col].astype('Int64')
+    return annualDF
 
-                # punt returns are unique in that their yards are stored as
-                #   the substring `_rety` so they require their own `if`
-                if category == 'punt_return':
-                    yds = category + '_rety'
-                
-                # special calculations are required for statistics that
-                #   containt the values listed above.  They are calculated on
-                #   a case by case basis:                    
-                # avg = yds / att
-                if 'avg' in entry:   
-                    if sum(list(map(int, years_dict[att].values()))) == 0:
-                        temp_dict[entry] = 0
-                    else:
-                        temp_dict[entry] = sum(
-                            list(map(int, years_dict[yds].values())))/sum(
-                                    list(map(int, years_dict[att].values())))
-                elif 'yds/g' in entry:
-                    if sum(list(map(int, years_dict[g].values()))) == 0:
-                        temp_dict[entry] = 0
-                    else:
-                        temp_dict[entry] = sum(
-                            list(map(int, years_dict[yds].values())))/sum(
-                                    list(map(int, years_dict[g].values())))
-                # lng = maximum of all lng values present in data
-                elif 'lng' in entry:
-                    temp_dict[entry] = max(
-                            list(map(int, years_dict[entry].values())))
-                elif 'att/g' in entry:
-                    if sum(list(map(int, years_dict[g].values()))) == 0:
-                        temp_dict[entry] = 0
-                    else:
-                        temp_dict[entry] = sum(
-                            list(map(int, years_dict[att].values())))/sum(
-                                    list(map(int, years_dict[g].values())))
-                # 1st% = first / att
-                elif '1st%' in entry:
-                    if sum(list(map(int, years_dict[att].values()))) == 0:
-                        temp_dict[entry] = 0
-                    else:
-                        temp_dict[entry] = sum(
-                            list(map(int, years_dict[first].values())))/sum(
-                                    list(map(int, years_dict[att].values())))
-                elif 'pct' in entry:
-                    if sum(list(map(int, years_dict[comp].values()))) == 0:
-                        temp_dict[entry] = 0
-                    else:
-                        temp_dict[entry] = sum(
-                            list(map(int, years_dict[att].values())))/sum(
-                                    list(map(int, years_dict[comp].values())))
-                elif 'td%' in entry:
-                    if sum(list(map(int, years_dict[td].values()))) == 0:
-                        temp_dict[entry] = 0
-                    else:
-                        temp_dict[entry] = sum(
-                            list(map(int, years_dict[td].values())))/sum(
-                                    list(map(int, years_dict[att].values())))
-                elif 'int%' in entry:
-                    if sum(list(map(int, years_dict[INT].values()))) == 0:
-                        temp_dict[entry] = 0
-                    else:
-                        temp_dict[entry] = sum(
-                            list(map(int, years_dict[INT].values())))/sum(
-                                    list(map(int, years_dict[att].values())))
-                elif 'rate' in entry:
-                    pass
-                # if the variable is `year` or `team` take the values from the
-                #   "newest" entry (i.e. first in order)
-                elif entry == 'year' or entry == 'team':
-                    temp_dict[entry] =  list(years_dict[entry].values())[0]
-                # sum all other variables together to create the new value
-                else:                    
-                    temp_dict[entry] = sum(
-                            list(map(int, years_dict[entry].values())))
-            final_list.append(temp_dict)
-            
-        else:
-            # add the data associated with that year to the final list
-            final_list.append(annualDF[annualDF['year'] == index].to_dict(
-                    orient='records')[0])
-            
-    return final_list
+def split_annual_frame(annualDF):
+    '''
+    Description:
+        This function converts a table of career stats back into a list of
+            seasons for every player, leaving out the stats a player has no
+            value for.
+    
+    Input:
+        annualDF (dataframe) - contains the career stats of every player
+            (see `create_annual_frame`)
+        
+    Output:
+        annual_dict (dictionary) - contains the list of seasons of every 
+            player (by `player_index`)
+    '''
+    annual_dict = {}
+    for record in annualDF.to_dict(orient='records'):
+        index = record.pop('player_index')
+        annual_dict.setdefault(index, []).append(
+                {k: v for k, v in record.items() if not pd.isna(v)})
+    return annual_dict
 
 def standardize_school_names(data):
     '''
@@ -313,26 +339,18 @@ def standardize_school_names(data):
     Output:
         data (list) - return the updated list of info
     '''
-    # import the spreadsheet we will be using to standardize school names
-    schoolsDF = pd.read_csv(Path('Data','school_abbreviations.csv'))
-    schoolsList = schoolsDF.to_dict(orient='records')
+    # load the compiled map of every abbreviation of every school name and
+    #   look up all of the school names at once
+    alias_map = load_alias_map(Path('Data','school_abbreviations.csv'), 
+                               'abbreviations')
+    names = standardize_names(pd.Series(
+            [info['college'] for info in data], dtype = object), alias_map)
 
-    # iterate over element in the input data, look up the school name, and
-    #   set it to the desired value (if it exists)
-    for info in data:
-        # find matching school and change the name, as required
-        for school in schoolsList:
-            if info['college'] in [school['Team'], 
-                          school['Abbreviation1'],
-                          school['Abbreviation2'],
-                          school['Abbreviation3'],
-                          school['Abbreviation4'],
-                          school['Abbreviation5']]:
-#                if info['college'] != school['Team']:
-#                    print('Changing: ' + info['college'] + ' to ' +
-#                          school['Team'])
-                info['college'] = school['Team']
-                break
+    # set every school name to the desired value (if it exists)
+    for info, name in zip(data, names):
+#        if info['college'] != name:
+#            print('Changing: ' + info['college'] + ' to ' + name)
+        info['college'] = name
     
     # return the formatted data
     return data
@@ -346,28 +364,49 @@ os.chdir(r'/home/ejreidelbach/Projects/NFL/')
 
 # Iterate over every position folder
 position_folder_list = [f for f in os.listdir(Path('Data','PlayerStats'))]
+path_store = Path('Data','PlayerStatsColumnar')
 for position in position_folder_list:
-    # Identify all available .json files in the position folder
-    
-    # Read in all player data from the available JSON files
-    files = [f for f in os.listdir(Path('Data', 'PlayerStats', position)) 
-                if f.endswith('_' + position + '.json') 
-                and len(f) > len(position+'.json')]
-    files = sorted(files)
-    
+    # Read in all player data from the columnar store if the position has
+    #   been stored there and the store is up to date with the scraped JSON
+    #   files (see player_stats_store.py)
     stat_list = []
-    for file in files:
-        with open(Path('Data', 'PlayerStats', position, file), 'r') as f:
-            jsonFile = json.load(f)   
-            for player in jsonFile:
-                stat_list.append(player)
+    if position_store_current(Path('Data', 'PlayerStats'), path_store,
+                              position):
+        for year_list in load_position_stats(path_store, position).values():
+            stat_list.extend(year_list)
+    
+    # Otherwise identify all available .json files in the position folder
+    #   and read in all player data from them
+    else:
+        if len(list_position_years(path_store, position)) > 0:
+            print('Columnar store of ' + position + ' is out of date; '
+                  'reading the JSON files instead')
+        files = [f for f in os.listdir(Path('Data', 'PlayerStats', position)) 
+                    if f.endswith('_' + position + '.json') 
+                    and len(f) > len(position+'.json')]
+        files = sorted(files)
+        
+        for file in files:
+            with open(Path('Data', 'PlayerStats', position, file), 'r') as f:
+                jsonFile = json.load(f)   
+                for player in jsonFile:
+                    stat_list.append(player)
                 
+    # Combine the stats of seasons in which players played for multiple 
+    #   teams such that there is only one row per player per year (all 
+    #   players of the position at once)
+    annualDF = create_annual_frame(stat_list)
+    multi_set = set(annualDF.loc[annualDF.duplicated(
+            ['player_index', 'year']), 'player_index'])
+    annual_dict = split_annual_frame(combine_multiyear_stats(
+            annualDF[annualDF['player_index'].isin(multi_set)]))
+    
     # Unpack nested career data and situational data for each player
     stat_list_flattened = []
-    for row in stat_list:
+    for index, row in enumerate(stat_list):
         # running counter for status
-        if stat_list.index(row)%25 == 0:
-            print('Processing ' + position + ': ' + str(stat_list.index(row)) + 
+        if index%25 == 0:
+            print('Processing ' + position + ': ' + str(index) + 
                   ' out of ' + str(len(stat_list)) + '.')
             
         # skip the player if NoneType detected
@@ -386,23 +425,20 @@ for position in position_folder_list:
             stats_annual = player.pop('stats_annual')
         except:
             print('No Annual stats found for Player #: ' + 
-                  str(stat_list.index(row)) + ' - ' + 
+                  str(index) + ' - ' + 
                   player['name_first'] + ' ' + player['name_last'])
         try:
             stats_situational = player.pop('stats_situational')
         except:
             print('No Situational stats found for Player #: ' + 
-                  str(stat_list.index(row)) + ' - ' + 
+                  str(index) + ' - ' + 
                   player['name_first'] + ' ' + player['name_last'])            
             stats_situation = []
         
-        # check to see if any years have multiple stat entries
-        # if they do, compress `stats_annual` such that there is only one row
-        # row per year and any years with 2 or more teams are reduced to 1
-        if len([d['year'] for d in stats_annual]) != len(
-                set([d['year'] for d in stats_annual])):
-            #print('Multiple years detected for: ' + str(stat_list.index(row)))
-            stats_annual = combine_multiyear_stats(stats_annual)
+        # if any years had multiple stat entries, use the compressed version
+        #   of `stats_annual` with only one row per year
+        if index in multi_set:
+            stats_annual = annual_dict[index]
     
         # sort both lists of dictionaries so they're in year order
         stats_annual = sorted(stats_annual, key=lambda k: k['year'])
@@ -28,6 +28,7 @@ import tqdm
 
 from ast import literal_eval
 from functools import reduce
+from school_names import load_alias_map, standardize_names
 
 #==============================================================================
 # Reference Variable Declaration
@@ -648,42 +649,14 @@ def rename_nfl(df, name_var):
         df : Pandas Dataframe
             DataFrame containing the standardized team name
     '''  
-    # read in school name information
-    df_team_names = pd.read_csv(path_dir.joinpath(
-            'positionData/names_pictures_nfl.csv'))    
-     
-    # convert the dataframe to a dictionary such that the keys are the
-    #   optional spelling of each team and the value is the standardized
-    #   name of the team
-    dict_team_names = {}
-    
-    for index, row in df_team_names.iterrows():
-        # isolate the alternative name columns
-        names = row[[x for x in row.index if 'name' in x.lower()]]
-        names.pop('URL_NAME')
-        # convert the row to a list that doesn't include NaN values
-        list_names_nicknames = [
-                x for x in names.values.tolist() if str(x) != 'nan']
-        # extract the standardized team name
-        name_standardized = row['Team']
-        # add the standardized name
-        list_names_nicknames.append(name_standardized)
-        # for every alternative spelling of the team, set the value to be
-        #   the standardized name
-        for name_alternate in list_names_nicknames:
-            dict_team_names[name_alternate] = row['FullName']
-            
-    def swapteamName(name_old):
-        if ((name_old == 'nan') or (pd.isna(name_old)) or 
-             (name_old == 'none') or (name_old == '')):
-            return ''
-        try:
-            return dict_team_names[name_old]
-        except:
-            print('Did not find: %s' % (name_old))
-            return name_old
-            
-    df[name_var] = df[name_var].apply(lambda x: swapteamName(x))
+    # standardize the names with the compiled map of every alternative 
+    #   spelling of each team, standardized to the team's full name (see 
+    #   school_names.py)
+    dict_team_names = load_alias_map(path_dir.joinpath(
+            'positionData/names_pictures_nfl.csv'), 'nfl_full')
+    df[name_var] = standardize_names(df[name_var], dict_team_names, 
+                                     blank_missing = True, 
+                                     report_missing = True)
     
     return df   
     
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 18:02:15 2026
+
+@author: ejreidelbach
+
+:DESCRIPTION:
+    Shared lookups for joining NFL.com players to other player sources.
+
+    Players are matched on their first name, last name and the first word of
+    their school (i.e. `Penn` for `Penn St.`).  Rather than scanning every
+    record of a source for every player, the records of a source are indexed
+    once by that key so that every player is matched with a single lookup:
+        - `load_draft_index` indexes the historic draft data
+            (`Data/Draft/historic_draft_data.json`) and saves the index next
+            to it so later runs (and other scripts joining to the draft
+            history) reuse it until the draft data changes
+        - `build_player_index` indexes any list of records (i.e. the
+            combine data from mockdraftable.com)
+
+    `join_player_records` then joins the indexed records to a list of
+    player-seasons:  every distinct player is looked up only once and the
+    matching record is copied to all of his seasons.  It returns the number
+    of players that were (and were not) matched so the quality of a join can
+    be followed from run to run.
+
+    When several records share the same key, the first record in the
+    source's order is kept (the same record the original linear scans
+    stopped at).
+
+:REQUIRES:
+
+:TODO:
+"""
+
+#==============================================================================
+# Package Import
+#==============================================================================
+import json
+import os
+from pathlib import Path
+
+#==============================================================================
+# Function Definitions / Reference Variable Declaration
+#==============================================================================
+# name of the saved draft index (stored in the folder of the draft data)
+draft_index_file = 'historic_draft_index.json'
+
+def make_player_key(name_first, name_last, school):
+    '''
+    Description:
+        This function creates the key used to match players across sources:
+            first name, last name and the first word of the player's school.
+            Players missing any of them (i.e. a combine record whose college
+            was not listed) have no key and cannot be matched.
+
+    Input:
+        name_first (string) - player's first name
+        name_last (string) - player's last name
+        school (string) - player's college
+
+    Output:
+        key (string) - key of the player (None if the player has no key)
+    '''
+    if not all(isinstance(x, str) for x in [name_first, name_last, school]):
+        return None
+    return '|'.join([name_first, name_last, school.split(' ')[0]])
+
+def build_player_index(record_list, first='nameFirst', last='nameLast',
+                       school='school'):
+    '''
+    Description:
+        This function indexes a list of player records by player key,
+            keeping the first record for every key.  Records without a key
+            (see `make_player_key`) are skipped.
+
+    Input:
+        record_list (list) - contains the player records to index
+        first (string) - name of the records' first name variable
+        last (string) - name of the records' last name variable
+        school (string) - name of the records' school variable
+
+    Output:
+        index (dictionary) - contains the record of every player key
+    '''
+    index = {}
+    for record in record_list:
+        key = make_player_key(record.get(first), record.get(last),
+                              record.get(school))
+        if key is not None:
+            index.setdefault(key, record)
+    return index
+
+def build_draft_index(draft_list):
+    '''
+    Description:
+        This function indexes the historic draft data by player key,
+            keeping the first pick for every key.
+
+    Input:
+        draft_list (list) - contains information on players drafted since 1970
+
+    Output:
+        draft_index (dictionary) - contains the pick of every player key
+    '''
+    return build_player_index(draft_list, 'nameFirst', 'nameLast', 'school')
+
+def load_draft_index(path_draft=Path('Data', 'Draft',
+                                     'historic_draft_data.json')):
+    '''
+    Description:
+        This function returns the index of the historic draft data.  The
+            saved index is used if it is newer than the draft data, otherwise
+            the index is rebuilt from the draft data and saved.
+
+    Input:
+        path_draft (Path) - historic draft data (.json)
+
+    Output:
+        draft_index (dictionary) - contains the pick of every player key
+    '''
+    path_index = Path(Path(path_draft).parent, draft_index_file)
+    if (path_index.exists() and
+            os.path.getmtime(path_index) >= os.path.getmtime(path_draft)):
+        with open(path_index, 'r') as f:
+            return json.load(f)
+
+    with open(path_draft, 'r') as f:
+        draft_index = build_draft_index(json.load(f))
+    # write to a temporary file first so an interrupted run never leaves a
+    #   partial index behind
+    path_temp = Path(str(path_index) + '.tmp')
+    with open(path_temp, 'wt') as out:
+        json.dump(draft_index, out)
+    os.replace(path_temp, path_index)
+    return draft_index
+
+def join_player_records(player_list, index, var_map):
+    '''
+    Description:
+        This function joins indexed records to a list of NFL.com player
+            records (one per player-season).  The seasons are grouped by
+            player key so every player is looked up only once, and the
+            variables of a matching record are copied to all of the player's
+            seasons.  Players without a key (see `make_player_key`) are
+            counted as missed.
+
+    Input:
+        player_list (list) - contains player info from NFL.com (uses the
+            `name_first`, `name_last` and `college` variables)
+        index (dictionary) - contains the record of every player key (see
+            `build_player_index`)
+        var_map (list) - contains (player variable, record variable) pairs
+            of the variables to copy from a matching record
+
+    Output:
+        matched (int) - number of players with a matching record
+        missed (int) - number of players without a matching record
+    '''
+    # group the player-seasons by player (players without a key can never
+    #   match and are only counted)
+    season_dict = {}
+    keyless = set()
+    for player in player_list:
+        key = make_player_key(player['name_first'], player['name_last'],
+                              player['college'])
+        if key is None:
+            keyless.add((str(player['name_first']), str(player['name_last']),
+                         str(player['college'])))
+        else:
+            season_dict.setdefault(key, []).append(player)
+
+    matched = 0
+    for key, season_list in season_dict.items():
+        record = index.get(key)
+        if record is None:
+            continue
+        matched += 1
+        values = [(a, record[b]) for a, b in var_map]
+        for player in season_list:
+            player.update(values)
+    return matched, len(season_dict) - matched + len(keyless)
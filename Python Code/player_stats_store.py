@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 16:41:27 2026
+
+@author: ejreidelbach
+
+:DESCRIPTION:
+    Columnar (Parquet) storage for the player statistics scraped from NFL.com.
+    The scraped JSON files (`Data/PlayerStats/<POSITION>/<YEAR>_<POSITION>.json`)
+    are pretty-printed lists of nested player dictionaries which have to be
+    parsed in full whenever any part of them is needed.  This script stores
+    the same data as three tables per position group:
+        - players:  one row per player (name, college, draft info, etc.)
+        - stats_annual:  one row per player per season of career stats
+        - stats_situational:  one row per player per season of
+            situational stats
+    Every row of the stats tables carries the `player_index` (the player's
+    position in his original JSON file) and `url` of its player so the
+    tables can be joined back together, and the players table records the
+    number of rows every player has in each stats table (`stats_annual_rows`
+    and `stats_situational_rows`, null if the player had no such list).
+
+    The tables are written to `Data/PlayerStatsColumnar` and partitioned by
+    position group (one folder per position) and by the year of the JSON
+    file they came from (one row group per year):
+        <POSITION>/<table>.parquet
+    so a read only decodes the years that were asked for and only the
+    columns that were asked for (see `read_position_table`).  One file per
+    table rather than one per year keeps the (wide) schema of the
+    situational stats from being parsed over and over.
+
+    Every column has a single type for the whole position group:  the
+    player information columns use the types declared in `player_schema`
+    and every stat column is typed from the values scraped for it (string,
+    64-bit integer, or 64-bit float if any of its values is a decimal).
+    Missing stats are stored as nulls.
+
+    The scrapers keep writing JSON files, so the store has to be rebuilt
+    (`write_position`) after every scrape; `position_store_current` tells
+    whether a position's store is still up to date with its JSON files.
+
+    `load_position_stats` rebuilds the original list of player dictionaries
+    and `export_position_json` writes it back out in the scraper's JSON
+    format for anything that still needs the JSON files.  The export matches
+    the original files except that:
+        - empty (null) player entries are not stored
+        - whole numbers in a stat column that also holds decimals are
+            written as floats (i.e. `0` becomes `0.0`)
+
+:REQUIRES:
+    - Pandas
+    - PyArrow
+
+:TODO:
+"""
+
+#==============================================================================
+# Package Import
+#==============================================================================
+import json
+import os
+from pathlib import Path
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+#==============================================================================
+# Function Definitions / Reference Variable Declaration
+#==============================================================================
+# types of the player information columns scraped from NFL.com (any column
+#   not listed here is typed from its values)
+player_schema = {'birthday': pa.string(),
+                 'college': pa.string(),
+                 'draft_pick_overall': pa.string(),
+                 'draft_pick_round': pa.string(),
+                 'draft_round': pa.string(),
+                 'draft_team': pa.string(),
+                 'height': pa.string(),
+                 'heightInches': pa.int64(),
+                 'high_school_state': pa.string(),
+                 'name_first': pa.string(),
+                 'name_last': pa.string(),
+                 'pic_url': pa.string(),
+                 'position': pa.string(),
+                 'team_current': pa.string(),
+                 'team_pic_url': pa.string(),
+                 'url': pa.string(),
+                 'weight': pa.string(),
+                 }
+
+# nested lists of stats in every player dictionary (each is stored as its own
+#   table)
+stat_tables = ['stats_annual', 'stats_situational']
+
+# columns linking every row of a stats table to its player
+key_schema = {'player_index': pa.int64(), 'url': pa.string()}
+
+# compression used for the Parquet files
+compression = 'zstd'
+
+def infer_schema(record_list, declared=None):
+    '''
+    Description:
+        This function determines the type of every column in a list of
+            records:  a column is a string if any of its values are strings,
+            a float if any of its values are decimals and an integer
+            otherwise.  Types in `declared` take precedence.
+
+    Input:
+        record_list (list) - contains dictionaries of column:value pairs
+        declared (dictionary) - column:type pairs that are already known
+
+    Output:
+        schema (pyarrow schema) - contains a field for every column (sorted
+            by name) found in the records
+    '''
+    if declared is None:
+        declared = {}
+
+    # track every Python type seen for every column
+    type_dict = {}
+    for record in record_list:
+        for key, value in record.items():
+            if value is not None:
+                type_dict.setdefault(key, set()).add(type(value))
+            else:
+                type_dict.setdefault(key, set())
+
+    field_list = []
+    for key in sorted(type_dict):
+        if key in declared:
+            field_list.append(pa.field(key, declared[key]))
+        elif str in type_dict[key]:
+            field_list.append(pa.field(key, pa.string()))
+        elif float in type_dict[key]:
+            field_list.append(pa.field(key, pa.float64()))
+        elif bool in type_dict[key] and len(type_dict[key]) == 1:
+            field_list.append(pa.field(key, pa.bool_()))
+        else:
+            field_list.append(pa.field(key, pa.int64()))
+    return pa.schema(field_list)
+
+def split_player_stats(player_list):
+    '''
+    Description:
+        This function splits a list of scraped (nested) player dictionaries
+            into the records of the three tables:  player information,
+            annual stats and situational stats.
+
+    Input:
+        player_list (list) - contains all scraped player info from NFL.com
+            for one year of a position group
+
+    Output:
+        table_dict (dictionary) - contains a list of records for `players`
+            and for every table in `stat_tables`
+    '''
+    table_dict = {'players': []}
+    for table in stat_tables:
+        table_dict[table] = []
+
+    for index, player in enumerate(player_list):
+        # skip empty player entries
+        if player is None:
+            continue
+
+        info = {'player_index': index}
+        for key, value in player.items():
+            if key in stat_tables:
+                info[key + '_rows'] = len(value)
+                for stats in value:
+                    record = {'player_index': index, 'url': player['url']}
+                    record.update(stats)
+                    table_dict[key].append(record)
+            else:
+                info[key] = value
+        table_dict['players'].append(info)
+    return table_dict
+
+def position_schemas(year_dict):
+    '''
+    Description:
+        This function determines the schema of every table of a position
+            group from the records of all its years, so that every year of
+            the position is stored with the same column types.
+
+    Input:
+        year_dict (dictionary) - contains the table records (see
+            `split_player_stats`) for every year of a position group
+
+    Output:
+        schema_dict (dictionary) - contains the schema of every table
+    '''
+    schema_dict = {}
+    for table in ['players'] + stat_tables:
+        record_list = [record for table_dict in year_dict.values()
+                       for record in table_dict[table]]
+        declared = dict(key_schema)
+        if table == 'players':
+            declared.update(player_schema)
+            for stat_table in stat_tables:
+                declared[stat_table + '_rows'] = pa.int64()
+        schema = infer_schema(record_list, declared)
+
+        # place the key columns first
+        key_list = [key for key in key_schema if key in schema.names]
+        schema_dict[table] = pa.schema(
+                [schema.field(key) for key in key_list] +
+                [field for field in schema if field.name not in key_list])
+    return schema_dict
+
+def write_position(path_stats, path_store, position):
+    '''
+    Description:
+        This function converts every scraped JSON file of a position group
+            to the columnar store, replacing whatever was previously stored
+            for the position.  Every table is written to one Parquet file
+            with one row group per year.
+
+    Input:
+        path_stats (Path) - folder containing the position group folders of
+            scraped JSON files (i.e. `Data/PlayerStats`)
+        path_store (Path) - folder of the columnar store
+        position (string) - position group (i.e. `WIDE_RECEIVER`)
+
+    Output:
+        year_list (list) - years of the position group that were stored
+    '''
+    # Read in all player data from the available JSON files
+    files = sorted([f for f in os.listdir(Path(path_stats, position))
+                    if f.endswith('_' + position + '.json')
+                    and len(f) > len(position+'.json')])
+    year_dict = {}
+    for file in files:
+        with open(Path(path_stats, position, file), 'r') as f:
+            year_dict[file.split('_')[0]] = split_player_stats(json.load(f))
+    year_list = list(year_dict)
+
+    # Write every table with the position's schemas, one year at a time
+    Path(path_store, position).mkdir(parents = True, exist_ok = True)
+    schema_dict = position_schemas(year_dict)
+    for table, schema in schema_dict.items():
+        schema = schema.with_metadata(
+                {'scrape_years': json.dumps(year_list)})
+        with pq.ParquetWriter(Path(path_store, position, table + '.parquet'),
+                              schema, compression = compression) as writer:
+            for year, table_dict in year_dict.items():
+                writer.write_table(pa.Table.from_pylist(
+                        table_dict[table], schema = schema),
+                        row_group_size = len(table_dict[table]) + 1)
+
+    print('Stored ' + str(len(year_list)) + ' years of ' + position)
+    return year_list
+
+def list_position_years(path_store, position):
+    '''
+    Description:
+        This function lists the years stored for a position group.
+
+    Input:
+        path_store (Path) - folder of the columnar store
+        position (string) - position group (i.e. `WIDE_RECEIVER`)
+
+    Output:
+        year_list (list) - stored years, in the order of the row groups
+    '''
+    path_players = Path(path_store, position, 'players.parquet')
+    if not path_players.exists():
+        return []
+    return json.loads(pq.read_schema(path_players).metadata[b'scrape_years'])
+
+def position_store_current(path_stats, path_store, position):
+    '''
+    Description:
+        This function checks whether the columnar store of a position group
+            is up to date with its scraped JSON files:  every JSON year must
+            be stored (and no other year) and no JSON file may be newer than
+            the store's files.  The scrapers only write JSON files, so the
+            store is out of date whenever a year has been (re)scraped since
+            `write_position` was last run.
+
+    Input:
+        path_stats (Path) - folder containing the position group folders of
+            scraped JSON files (i.e. `Data/PlayerStats`)
+        path_store (Path) - folder of the columnar store
+        position (string) - position group (i.e. `WIDE_RECEIVER`)
+
+    Output:
+        current (boolean) - True if the store can be read instead of the
+            JSON files
+    '''
+    path_list = [Path(path_store, position, table + '.parquet')
+                 for table in ['players'] + stat_tables]
+    if not all(path.exists() for path in path_list):
+        return False
+
+    files = [f for f in os.listdir(Path(path_stats, position))
+             if f.endswith('_' + position + '.json')
+             and len(f) > len(position+'.json')]
+    if (sorted(f.split('_')[0] for f in files) !=
+            sorted(list_position_years(path_store, position))):
+        return False
+
+    stored = min(os.path.getmtime(path) for path in path_list)
+    return all(os.path.getmtime(Path(path_stats, position, f)) <= stored
+               for f in files)
+
+def read_position_arrow(path_store, position, table, columns=None,
+                        years=None):
+    '''
+    Description:
+        This function reads one table of a position group from the columnar
+            store as an Arrow table, only decoding the requested columns of
+            the requested years.
+
+    Input:
+        path_store (Path) - folder of the columnar store
+        position (string) - position group (i.e. `WIDE_RECEIVER`)
+        table (string) - `players`, `stats_annual` or `stats_situational`
+        columns (list) - columns to read (None: every column)
+        years (list) - years to read (None: every year)
+
+    Output:
+        table (pyarrow table) - contains the requested data along with a
+            `scrape_year` column identifying the year of every row
+    '''
+    parquet_file = pq.ParquetFile(Path(path_store, position, table + '.parquet'))
+    year_list = json.loads(parquet_file.schema_arrow.metadata[b'scrape_years'])
+    if years is None:
+        years = year_list
+    years = [str(year) for year in years]
+
+    # every year is stored in its own row group
+    group_list = [year_list.index(year) for year in years if year in year_list]
+    arrow_table = parquet_file.read_row_groups(group_list, columns = columns)
+
+    year_column = []
+    for group in group_list:
+        year_column.extend([year_list[group]]*parquet_file.metadata.row_group(
+                group).num_rows)
+    return arrow_table.append_column('scrape_year', pa.array(
+            year_column, type = pa.string()))
+
+def read_position_table(path_store, position, table, columns=None,
+                        years=None):
+    '''
+    Description:
+        This function reads one table of a position group from the columnar
+            store, only decoding the requested columns of the requested
+            years.
+
+    Input:
+        path_store (Path) - folder of the columnar store
+        position (string) - position group (i.e. `WIDE_RECEIVER`)
+        table (string) - `players`, `stats_annual` or `stats_situational`
+        columns (list) - columns to read (None: every column)
+        years (list) - years to read (None: every year)
+
+    Output:
+        tableDF (dataframe) - contains the requested data along with a
+            `scrape_year` column identifying the year of every row
+    '''
+    return read_position_arrow(
+            path_store, position, table, columns, years).to_pandas()
+
+def table_to_records(arrow_table):
+    '''
+    Description:
+        This function converts an Arrow table to a list of dictionaries,
+            leaving out the null values of every row.
+
+    Input:
+        arrow_table (pyarrow table) - table to convert
+
+    Output:
+        record_list (list) - contains one dictionary per row
+    '''
+    record_list = [{} for row in range(arrow_table.num_rows)]
+    for name, column in zip(arrow_table.column_names, arrow_table.columns):
+        # skip columns without any values
+        if column.null_count == len(column):
+            continue
+        for record, value in zip(record_list, column.to_pylist()):
+            if value is not None:
+                record[name] = value
+    return record_list
+
+def load_position_stats(path_store, position, years=None):
+    '''
+    Description:
+        This function rebuilds the scraped (nested) player dictionaries of a
+            position group from the columnar store, in the same order as the
+            original JSON files.  Missing (null) values are left out of the
+            dictionaries, just as they were absent from the JSON files.
+
+    Input:
+        path_store (Path) - folder of the columnar store
+        position (string) - position group (i.e. `WIDE_RECEIVER`)
+        years (list) - years to read (None: every year)
+
+    Output:
+        year_dict (dictionary) - contains the list of player dictionaries
+            for every year
+    '''
+    if years is None:
+        years = list_position_years(path_store, position)
+
+    table_dict = {}
+    for table in ['players'] + stat_tables:
+        table_dict[table] = table_to_records(read_position_arrow(
+                path_store, position, table, years = years))
+
+    # gather the stats of every player (rows are stored in player order)
+    stats_dict = {}
+    for table in stat_tables:
+        for record in table_dict[table]:
+            key = (record.pop('scrape_year'), record.pop('player_index'), table)
+            record.pop('url')
+            stats_dict.setdefault(key, []).append(record)
+
+    year_dict = {str(year): [] for year in years}
+    for player in table_dict['players']:
+        year = player.pop('scrape_year')
+        index = player.pop('player_index')
+        for table in stat_tables:
+            # only players that had the list of stats get one back
+            if player.pop(table + '_rows', None) is not None:
+                player[table] = stats_dict.get((year, index, table), [])
+        year_dict.setdefault(year, []).append(player)
+    return year_dict
+
+def export_position_json(path_store, path_out, position, years=None):
+    '''
+    Description:
+        This function writes the players of a position group back out from
+            the columnar store as `<YEAR>_<POSITION>.json` files in the same
+            format as the scraper.
+
+    Input:
+        path_store (Path) - folder of the columnar store
+        path_out (Path) - folder in which to write the JSON files
+        position (string) - position group (i.e. `WIDE_RECEIVER`)
+        years (list) - years to export (None: every year)
+
+    Output:
+        file_list (list) - paths of the JSON files that were written
+    '''
+    Path(path_out).mkdir(parents = True, exist_ok = True)
+    file_list = []
+    for year, player_list in load_position_stats(
+            path_store, position, years).items():
+        filename = Path(path_out, year + '_' + position + '.json')
+        with open(filename, 'wt') as out:
+            json.dump(player_list, out, sort_keys=True, indent=4, separators=(
+                    ',', ': '))
+        file_list.append(filename)
+    return file_list
+
+#==============================================================================
+# Working Code
+#==============================================================================
+if __name__ == '__main__':
+    # Set the project working directory
+    os.chdir(r'/home/ejreidelbach/Projects/NFL/')
+
+    # Convert every position folder of scraped JSON files
+    path_stats = Path('Data', 'PlayerStats')
+    path_store = Path('Data', 'PlayerStatsColumnar')
+    for position in sorted(os.listdir(path_stats)):
+        if Path(path_stats, position).is_dir():
+            write_position(path_stats, path_store, position)
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 19:20:48 2026
+
+@author: ejreidelbach
+
+:DESCRIPTION:
+    Shared name standardization for schools (and NFL teams).
+
+    Every alias file is compiled once into a single dictionary mapping every
+    alternative spelling of a name to its standardized name.  The compiled
+    map is saved next to the alias file (`<file>_<format>_aliases.json`, as
+    one alias file may be compiled in more than one format) and reused,
+    both within a run and by later runs, until the alias file changes.  A
+    whole column of names is then standardized with one vectorized `map`
+    (see `standardize_names`) rather than by scanning the alias file for
+    every record.
+
+    The supported alias files (`alias_formats`) are:
+        - abbreviations:  `school_abbreviations.csv` (the standardized `Team`
+            name followed by the `Abbreviation1` to `Abbreviation5` columns).
+            If an alias appears in several rows, the first row is used.
+        - ncaa:  `names_pictures_ncaa.csv` (the standardized `Team` name,
+            alternative `Name` columns and a `Nickname` that is also
+            appended to every name).  If an alias appears in several rows,
+            the last row is used.
+        - nfl:  `names_pictures_nfl.csv` (the standardized `Team` name and
+            alternative `name` columns).  If an alias appears in several
+            rows, the last row is used.
+        - nfl_full:  `names_pictures_nfl.csv` standardized to every team's
+            `FullName` rather than its `Team` name (the `URL_NAME` column is
+            not an alias).  If an alias appears in several rows, the last row
+            is used.
+
+:REQUIRES:
+    - Pandas
+
+:TODO:
+"""
+
+#==============================================================================
+# Package Import
+#==============================================================================
+import json
+import os
+import pandas as pd
+from pathlib import Path
+import threading
+
+#==============================================================================
+# Function Definitions / Reference Variable Declaration
+#==============================================================================
+# compiled alias maps already loaded in this run (keyed by alias file)
+alias_map_dict = {}
+alias_map_lock = threading.Lock()
+
+def compile_abbreviations(aliasDF):
+    '''
+    Description:
+        This function compiles `school_abbreviations.csv` into an alias map.
+
+    Input:
+        aliasDF (dataframe) - contents of the alias file
+
+    Output:
+        alias_map (dictionary) - contains the standardized name of every alias
+    '''
+    alias_map = {}
+    abbreviation_list = [col for col in aliasDF.columns
+                         if col.startswith('Abbreviation')]
+    for row in aliasDF[['Team'] + abbreviation_list].itertuples(index=False):
+        for name in row:
+            if isinstance(name, str):
+                alias_map.setdefault(name, row[0])
+    return alias_map
+
+def compile_ncaa(aliasDF):
+    '''
+    Description:
+        This function compiles `names_pictures_ncaa.csv` into an alias map.
+            Every name is also listed with the school's nickname appended to
+            it (i.e. `Penn St.` and `Penn St. Nittany Lions`).
+
+    Input:
+        aliasDF (dataframe) - contents of the alias file
+
+    Output:
+        alias_map (dictionary) - contains the standardized name of every alias
+    '''
+    alias_map = {}
+    name_list = [col for col in aliasDF.columns if 'Name' in col]
+    for row in aliasDF[['Team', 'Nickname'] + name_list].itertuples(
+            index=False):
+        name_standardized = row[0].strip()
+        list_names = [x.strip() for x in row[2:] if str(x) != 'nan']
+        list_names.append(name_standardized)
+        list_names_nicknames = list(list_names)
+        if isinstance(row[1], str):
+            list_names_nicknames.extend(
+                    [name + ' ' + row[1].strip() for name in list_names])
+        for name_alternate in list_names_nicknames:
+            alias_map[name_alternate] = name_standardized
+    return alias_map
+
+def compile_nfl(aliasDF):
+    '''
+    Description:
+        This function compiles `names_pictures_nfl.csv` into an alias map.
+
+    Input:
+        aliasDF (dataframe) - contents of the alias file
+
+    Output:
+        alias_map (dictionary) - contains the standardized name of every alias
+    '''
+    alias_map = {}
+    name_list = [col for col in aliasDF.columns if 'name' in col.lower()]
+    for row in aliasDF[['Team'] + name_list].itertuples(index=False):
+        for name_alternate in [x for x in row[1:] if str(x) != 'nan']:
+            alias_map[name_alternate] = row[0]
+        alias_map[row[0]] = row[0]
+    return alias_map
+
+def compile_nfl_full(aliasDF):
+    '''
+    Description:
+        This function compiles `names_pictures_nfl.csv` into an alias map
+            whose standardized names are the teams' full names (i.e.
+            `Pittsburgh Steelers`).
+
+    Input:
+        aliasDF (dataframe) - contents of the alias file
+
+    Output:
+        alias_map (dictionary) - contains the standardized name of every alias
+    '''
+    alias_map = {}
+    name_list = [col for col in aliasDF.columns
+                 if 'name' in col.lower() and col != 'URL_NAME']
+    for row in aliasDF[['Team', 'FullName'] + name_list].itertuples(
+            index=False):
+        for name_alternate in [x for x in row[2:] if str(x) != 'nan']:
+            alias_map[name_alternate] = row[1]
+        alias_map[row[0]] = row[1]
+    return alias_map
+
+# functions compiling each supported format of alias file
+alias_formats = {'abbreviations': compile_abbreviations,
+                 'ncaa': compile_ncaa,
+                 'nfl': compile_nfl,
+                 'nfl_full': compile_nfl_full}
+
+def load_alias_map(path_alias, alias_format):
+    '''
+    Description:
+        This function returns the compiled alias map of an alias file.  The
+            map is compiled only if it has not been loaded in this run and
+            its saved copy is missing or older than the alias file.
+
+    Input:
+        path_alias (Path) - alias file (.csv)
+        alias_format (string) - format of the alias file (see
+            `alias_formats`)
+
+    Output:
+        alias_map (dictionary) - contains the standardized name of every alias
+    '''
+    path_alias = Path(path_alias)
+    path_map = Path(path_alias.parent, '%s_%s_aliases.json' % (
+            path_alias.stem, alias_format))
+    with alias_map_lock:
+        key = (str(path_alias.resolve()), alias_format)
+        if key in alias_map_dict:
+            return alias_map_dict[key]
+
+        if (path_map.exists() and
+                os.path.getmtime(path_map) >= os.path.getmtime(path_alias)):
+            with open(path_map, 'r') as f:
+                alias_map = json.load(f)
+        else:
+            alias_map = alias_formats[alias_format](pd.read_csv(path_alias))
+            # write to a temporary file first so an interrupted run never
+            #   leaves a partial map behind
+            path_temp = Path(str(path_map) + '.tmp')
+            with open(path_temp, 'wt') as out:
+                json.dump(alias_map, out, sort_keys=True, indent=4)
+            os.replace(path_temp, path_map)
+
+        alias_map_dict[key] = alias_map
+        return alias_map
+
+def standardize_names(names, alias_map, blank_missing=False,
+                      report_missing=False):
+    '''
+    Description:
+        This function standardizes a column of names with an alias map.
+            Names without an alias (including missing names, unless
+            `blank_missing` is set) are kept as they are.
+
+    Input:
+        names (series) - names to standardize
+        alias_map (dictionary) - contains the standardized name of every
+            alias (see `load_alias_map`)
+        blank_missing (boolean) - replace missing names (NaN, 'nan', 'none'
+            or '') with ''
+        report_missing (boolean) - print every name (once) that has no alias
+
+    Output:
+        names_standardized (series) - standardized names
+    '''
+    # look every name up directly so that names without an alias (including
+    #   missing ones such as None) come back exactly as they were
+    names_standardized = pd.Series([alias_map.get(x, x) for x in names],
+                                   index=names.index, dtype=object)
+    not_found = pd.Series([x not in alias_map for x in names],
+                          index=names.index, dtype=bool)
+    if blank_missing:
+        blank = names.isna() | names.isin(['nan', 'none', ''])
+        names_standardized = names_standardized.mask(blank, '')
+        not_found = not_found & ~blank
+    if report_missing:
+        for name in names[not_found].unique():
+            print('Did not find: %s' % (name))
+    return names_standardized
@@ -9,7 +9,8 @@ Created on Wed May 16 15:01:38 2018
     - This script will scrape player historical data from NFL.com
     
 :REQUIRES:
-    
+    - scrape_fetch.py
+   
 :TODO:
     - Account for additional column header in kicker information regarding
         yardage kicks were attempted from
@@ -19,18 +20,14 @@ Created on Wed May 16 15:01:38 2018
 #==============================================================================
 # Package Import
 #==============================================================================
-from bs4 import BeautifulSoup
+from scrape_fetch import soupifyURL
 import json
 import os
 from pathlib import Path
-import requests
 
 #==============================================================================
 # Function Definitions / Reference Variable Declaration
 #==============================================================================
-headers = {"User-agent":
-           "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "\
-           "(KHTML, like Gecko) Chrome/47.0.2526.80 Safari/537.36"}
     
 
 # categories for various statistics
@@ -189,14 +186,9 @@ scrape_dict_year = {'QB':['PASSING','RUSHING','FUMBLES'],
                     'K':['FIELD GOAL KICKERS','KICKOFF STATS'],
                     } 
 
-def soupifyURL(url):
-    r = requests.get(url, headers=headers)
-    soup = BeautifulSoup(r.content,'html5lib')
-    return soup
-
 def scrapePlayerStats(url, year, index, list_length, position):
     playerInfo = {}
-    soup = soupifyURL(url)
+    soup = soupifyURL(url, 'html5lib')
     
     playerInfo['url'] = url
     playerInfo['position'] = position_dict[position]
@@ -269,7 +261,7 @@ def scrapePlayerStats(url, year, index, list_length, position):
 #                'div', {'class':'player-photo'}).find('img')['src']
     
     ### Extract Situational Stats for every year available
-    soup = soupifyURL(url + 'situationalstats')
+    soup = soupifyURL(url + 'situationalstats', 'html5lib')
     
     # Determine what years are available for the player
     year_soup = list(soup.find('select',{'id':'season'}).find_all('option'))
@@ -284,7 +276,8 @@ def scrapePlayerStats(url, year, index, list_length, position):
         yearPlayerInfo = {}
         yearPlayerInfo['year'] = scrape_year
         
-        soup = soupifyURL(url + 'situationalstats?season=' + scrape_year)
+        soup = soupifyURL(url + 'situationalstats?season=' + scrape_year,
+                          'html5lib')
         
         # Determine what stats are available for the player
         stat_split_list = []
@@ -364,7 +357,7 @@ def scrapePlayerStats(url, year, index, list_length, position):
     playerInfo['stats_situational'] = situational_stats_list
 
     ### Extract Summarized Annual Statistics
-    soup = soupifyURL(url + 'careerstats')
+    soup = soupifyURL(url + 'careerstats', 'html5lib')
 
     # Determine what years are available for the player
     try:
@@ -450,7 +443,7 @@ def scrapePlayerStats(url, year, index, list_length, position):
         playerInfo['stats_annual'] = career_stats_list
     
     ### Extract Draft
-    soup = soupifyURL(url + 'draft')
+    soup = soupifyURL(url + 'draft', 'html5lib')
     temp = soup.find('div', {'id':'draft-basics'})
     try:
         playerInfo['draft_round'] = temp.find_all(
@@ -485,7 +478,7 @@ def scrapePlayerURL(soup, url_list):
 def scrapeYearByPosition(startYear, stopYear, position):
     
     # A master list of every player scraped to prevent needless duplication
-    url_history_list = []
+    url_history_set = set()
             
     years_to_scrape_list = list(range(stopYear,startYear-1,-1))
     # for every year specified, scrape the desired statistics
@@ -498,7 +491,7 @@ def scrapeYearByPosition(startYear, stopYear, position):
         url = ('http://www.nfl.com/stats/categorystats?tabSeq=1&season=' 
            + year + '&seasonType=REG&d-447263-p=1&statisticPositionCategory=' 
            + position)
-        soup = soupifyURL(url)
+        soup = soupifyURL(url, 'html5lib')
            
         # Extract the number of remaining pages for that position
         pages_html = soup.find('span', {'class':'linkNavigation floatRight'})
@@ -510,21 +503,20 @@ def scrapeYearByPosition(startYear, stopYear, position):
         url_list = []
         url_list = scrapePlayerURL(soup, url_list)
         for url in page_url_list:
-            soup = soupifyURL(url)
+            soup = soupifyURL(url, 'html5lib')
             url_list = scrapePlayerURL(soup, url_list)
            
         # Extract player information for every player within a year
         playerList = []
-        for url in url_list:
-            if url not in url_history_list:
-                url_history_list.append(url)
+        for index, url in enumerate(url_list):
+            if url not in url_history_set:
+                url_history_set.add(url)
                 playerList.append(scrapePlayerStats(
-                        url, year, url_list.index(url), len(
-                                url_list), position)) 
+                        url, year, index, len(url_list), position)) 
             else:
                 print('Year ' + str(year) + ', Already read in: ' + url.split(
                         'players/')[1].split('/')[0] + ' (Player ' + \
-                        str(url_list.index(url)) + ' out of ' + str(
+                        str(index) + ' out of ' + str(
                                 len(url_list)-1) + ')')
             
         # Export the data set as a JSON file
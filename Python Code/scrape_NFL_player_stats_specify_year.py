@@ -9,7 +9,8 @@ Created on Thu Jun  7 16:15:31 2018
     - This script will scrape player historical data from NFL.com
     
 :REQUIRES:
-    
+    - scrape_fetch.py
+   
 :TODO:
     - Account for additional column header in kicker information regarding
         yardage kicks were attempted from
@@ -23,12 +24,10 @@ import cutie
 import json
 import os
 import pandas as pd
-import requests
 import tqdm
 
-from bs4 import BeautifulSoup
+from scrape_fetch import soupifyURL
 from pathlib import Path
-from requests.packages.urllib3.util.retry import Retry
 
 #==============================================================================
 # Reference Variable Declaration
@@ -290,32 +289,6 @@ def askUserForInput():
         
     return scrape_position, scrape_year
 
-def soupifyURL(url):
-    '''
-    Purpose: Turns a specified URL into BeautifulSoup formatted HTML 
-
-    Inputs
-    ------
-        url : string
-            Link to the designated website to be scraped
-    
-    Outputs
-    -------
-        soup : html
-            BeautifulSoup formatted HTML data stored as a complex tree of 
-            Python objects
-    '''
-    session = requests.Session()
-    retry = Retry(connect=3, backoff_factor=0.5)
-    adapter = requests.adapters.HTTPAdapter(max_retries=retry)
-    session.mount('http://', adapter)
-    session.mount('https://', adapter)
-    
-    r = session.get(url)
-    #r = requests.get(url)
-    soup = BeautifulSoup(r.content,'html.parser')   
-    return soup
-
 def scrapePlayerStats(player, year, order_index, list_length, position):
     '''
     '''
@@ -619,11 +592,13 @@ def compileExistingPlayers(path_position):
     files = sorted(files)
     
     player_list = []
+    player_set = set()
     for file in files:
         with open(file, 'r') as f:
             jsonFile = json.load(f)
             for player in jsonFile:
-                if player['url'] not in player_list:
+                if player['url'] not in player_set:
+                    player_set.add(player['url'])
                     player_list.append(player['url'])
     return player_list
 
@@ -654,10 +629,9 @@ def scrapePosition(year, position):
        
     # Extract player information for every player within a year
     playerList = []
-    for player in player_url_list:
+    for index, player in enumerate(player_url_list):
         playerList.append(scrapePlayerStats(
-                player, year, player_url_list.index(player), len(
-                        player_url_list), position)) 
+                player, year, index, len(player_url_list), position)) 
         
     # Export the data set as a JSON file
     #filename = '/' + position + '/' + year + '_' + position + '.json'
@@ -10,6 +10,7 @@ Created on Mon Apr  2 14:26:57 2018
     to obtain a complete listing of all players drafted in NFL history
     
 :REQUIRES:
+    - scrape_fetch.py
    
 :TODO:
 """
@@ -23,8 +24,7 @@ import json
 import os
 from selenium import webdriver
 from selenium.webdriver.firefox.options import Options
-from bs4 import BeautifulSoup
-import requests
+from scrape_fetch import soupifyURL
 import operator
 import pandas as pd
 
@@ -37,12 +37,6 @@ def retrieveYearURL(soup,linkList):
         linkList.append('https://www.mockdraftable.com' +link['href'])
     return linkList
 
-def soupifyURL(url):
-    r = requests.get(url, headers=headers)
-#    soup = BeautifulSoup(r.content,'lxml')
-    soup = BeautifulSoup(r.content,'html5lib')
-    return soup
-
 positionList = ['T','G','C']
 positionAbbrList = ['OT','OG','OC']
 
@@ -93,8 +87,6 @@ os.chdir(r'/home/ejreidelbach/projects/NFL/Data/Draft')
 mainURL = r'http://www.drafthistory.com/index.php/years/'
 
 # establish default header information
-headers = {"User-agent":
-           "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/47.0.2526.80 Safari/537.36"}
 
 # Open a PhantomJS web browser and direct it to the DEA's dropbox search page
 options = Options()
@@ -107,7 +99,7 @@ browser.implicitly_wait(100)
 browser.get(mainURL)
     
 # Iterate through every subsequent page in the position group
-soup = soupifyURL(browser.current_url)
+soup = soupifyURL(browser.current_url, 'html5lib')
 table = soup.find('table')
 
 url_list = []
@@ -125,7 +117,7 @@ url_list.sort(key=operator.itemgetter('year'))
 #   and add it to the overall list.
 draft_list = []
 for url in url_list[34:]:
-    soup = soupifyURL(url['url'])
+    soup = soupifyURL(url['url'], 'html5lib')
 
     #year_list = []   
     draft_round = ''
@@ -0,0 +1,720 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:05:12 2026
+
+@author: ejreidelbach
+
+:DESCRIPTION:
+    Shared fetch helpers for the scraping scripts.  Every page is requested
+    through one long-lived `requests.Session` (see `getSession`) so that
+    connections (and TLS sessions) are kept alive and reused across requests,
+    with a single retry/backoff policy for connection errors and server
+    errors.  `fetchStats` reports how many connections were opened for the
+    requests that were made.
+    Pages are requested through `fetchURL` (or `soupifyURL`), which keeps
+    the scrapers polite to every host:
+        - no more than `max_per_host` requests are open to a host at once
+        - requests to a host are scheduled with a token bucket whose rate
+            adapts to the host: it slowly rises while requests succeed and
+            is halved when the host responds with 429 or a server error,
+            and a Retry-After header pauses the host for the requested time
+        - `hostStats` reports every host's rate, queue depth, wait times
+            and number of throttled responses
+    `reportStats` prints both (along with the cache counts) at the end of
+    a scrape.
+    Pages are parsed with Python's built-in 'html.parser' unless a scraper
+    asks for another parser.  lxml is several times faster (`fast_parser`
+    is lxml when it is installed), but it can build a different tree for the
+    same page and several scrapers pick nodes by position, so a scraper
+    should only switch to it once `compareParsers` shows that it extracts
+    the same data from saved pages; see `benchmarkParsers` to time the
+    parsers.
+    `mapConcurrently` runs a scraping function over a list of items (i.e.
+    player pages) with a bounded pool of worker threads, returning the
+    results in the same order as the items so that the output of a
+    concurrent run is identical to that of a sequential one.
+    If a `cache_path` folder is set, every successful response is also
+    stored on disk (gzip compressed, one file per URL named after the hash
+    of the URL) so that later runs can reuse it:
+        - a cached page younger than `cache_ttl` seconds is returned without
+            contacting the website (`cache_ttl` of None: never expires)
+        - an expired page is revalidated with its ETag / Last-Modified
+            headers, so an unchanged page is not downloaded again
+        - if `cache_only` is True, pages are only ever read from the cache
+            (i.e. for re-parsing runs and tests that must not touch the
+            network)
+
+:REQUIRES:
+    - BeautifulSoup
+    - Requests
+    - lxml (optional, see `fast_parser`)
+
+:TODO:
+"""
+
+#==============================================================================
+# Package Import
+#==============================================================================
+import concurrent.futures
+import contextlib
+import datetime
+import email.utils
+import gzip
+import hashlib
+import importlib.util
+import json
+import os
+import requests
+import threading
+import time
+
+from bs4 import BeautifulSoup
+from requests.packages.urllib3.util.retry import Retry
+from urllib.parse import urlsplit
+
+#==============================================================================
+# Reference Variable Declaration
+#==============================================================================
+headers = {"User-agent":
+           "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "\
+           "(KHTML, like Gecko) Chrome/47.0.2526.80 Safari/537.36"}
+
+# maximum number of simultaneous requests to a single host
+max_per_host = 4
+
+# requests per second sent to a host:  every host starts at `host_rate`, the
+#   rate grows by `host_rate_step` after every successful request (up to
+#   `host_rate_max`) and is halved (down to `host_rate_min`) whenever the
+#   host responds with one of the `throttle_status` codes
+host_rate = 4.0
+host_rate_min = 0.1
+host_rate_max = 16.0
+host_rate_step = 0.1
+
+# starting (and maximum) rate for hosts that need to be treated more gently
+#   (sports-reference sites allow roughly 20 requests per minute)
+host_rate_dict = {'www.pro-football-reference.com': 1/3,
+                  'www.sports-reference.com': 1/3}
+
+# number of requests a host may receive back-to-back after a quiet period
+host_burst = 1
+
+# status codes which signal that a host wants requests to slow down, and
+#   the longest a Retry-After header may make us wait (seconds)
+throttle_status = [429, 500, 502, 503, 504]
+retry_after_max = 600
+
+# number of times (and backoff factor) to retry a request that fails to
+#   connect or times out reading (requests which return one of the
+#   `throttle_status` codes are also retried `retry_count` times, see
+#   `requestURL`)
+retry_count = 3
+retry_backoff = 0.5
+
+# seconds to wait for a server to respond before giving up on a request
+timeout = 30
+
+# number of connections kept open to every host by the session
+pool_size = 16
+
+# parser used by `soupifyURL` unless another one is requested, and the
+#   faster parser scrapers may opt in to (lxml if it's installed, otherwise
+#   the parser built into Python)
+default_parser = 'html.parser'
+if importlib.util.find_spec('lxml') is not None:
+    fast_parser = 'lxml'
+else:
+    fast_parser = 'html.parser'
+
+# folder in which responses are cached (set to None to disable the cache),
+#   number of seconds a cached response is used without revalidation (None:
+#   forever) and whether pages may only be read from the cache
+cache_path = None
+cache_ttl = None
+cache_only = False
+
+# number of pages served from the cache without contacting the website
+#   (`hits`), confirmed unchanged by the website (`revalidated`) and
+#   downloaded in full (`downloaded`), see `fetchStats`
+cache_counts = {'hits': 0, 'revalidated': 0, 'downloaded': 0}
+cache_lock = threading.Lock()
+
+# the shared session (created on first use)
+session = None
+session_lock = threading.Lock()
+
+# state kept for every host (see `getHost`):  a semaphore bounding the
+#   number of open requests, the token bucket and the host's statistics
+host_dict = {}
+host_lock = threading.Lock()
+
+#==============================================================================
+# Function Definitions
+#==============================================================================
+def getHost(url):
+    '''
+    Purpose: Returns the scheduling state of the host of a specified URL,
+        creating it on first use (see `host_dict`)
+
+    Inputs
+    ------
+        url : string
+            Link that is about to be requested
+
+    Outputs
+    -------
+        host_info : dictionary
+            Scheduling state of the URL's host
+    '''
+    host = urlsplit(url).netloc
+    with host_lock:
+        if host not in host_dict:
+            rate = host_rate_dict.get(host, host_rate)
+            host_dict[host] = {'slots': threading.Semaphore(max_per_host),
+                               'rate': rate,
+                               'rate_max': max(rate, host_rate_dict.get(
+                                       host, host_rate_max)),
+                               'tokens': host_burst,
+                               'updated': time.monotonic(),
+                               'blocked_until': 0.0,
+                               'waiting': 0,
+                               'waiting_max': 0,
+                               'requests': 0,
+                               'throttled': 0,
+                               'wait_time': 0.0}
+        return host_dict[host]
+
+@contextlib.contextmanager
+def hostSlot(url):
+    '''
+    Purpose: Waits until a request to the host of the specified URL is
+        allowed and holds one of the host's request slots until the request
+        is complete.  Every host has a token bucket which fills at the
+        host's current rate (requests per second, up to `host_burst`
+        tokens); a request needs one token and no request is sent while
+        the host has asked us to back off (see `adaptHostRate`).
+
+    Inputs
+    ------
+        url : string
+            Link that is about to be requested
+
+    Outputs
+    -------
+        None
+    '''
+    host_info = getHost(url)
+    wait_start = time.monotonic()
+    with host_lock:
+        host_info['waiting'] += 1
+        host_info['waiting_max'] = max(host_info['waiting_max'],
+                                       host_info['waiting'])
+
+    with host_info['slots']:
+        while True:
+            with host_lock:
+                # refill the bucket for the time that has passed
+                now = time.monotonic()
+                host_info['tokens'] = min(host_burst, host_info['tokens'] + (
+                        now - host_info['updated']) * host_info['rate'])
+                host_info['updated'] = now
+                if now >= host_info['blocked_until'] and (
+                        host_info['tokens'] >= 1):
+                    host_info['tokens'] -= 1
+                    host_info['waiting'] -= 1
+                    host_info['requests'] += 1
+                    host_info['wait_time'] += now - wait_start
+                    break
+                wait = max(host_info['blocked_until'] - now,
+                           (1 - host_info['tokens']) / host_info['rate'])
+            time.sleep(wait)
+        yield
+
+def adaptHostRate(url, r):
+    '''
+    Purpose: Adjusts the request rate of a host based on its response:
+        the rate is halved (down to `host_rate_min`) when the host responds
+        with one of the `throttle_status` codes and raised by
+        `host_rate_step` (up to the host's maximum) otherwise.  If the
+        response has a Retry-After header, no request is sent to the host
+        until that time has passed.
+
+    Inputs
+    ------
+        url : string
+            Link that was requested
+        r : requests.Response
+            Response returned by the website
+
+    Outputs
+    -------
+        None
+    '''
+    host_info = getHost(url)
+    with host_lock:
+        if r.status_code in throttle_status:
+            host_info['throttled'] += 1
+            host_info['rate'] = max(host_rate_min, host_info['rate'] / 2)
+            # the bucket is emptied so the slower rate applies right away
+            host_info['tokens'] = min(host_info['tokens'], 0)
+            retry_after = r.headers.get('Retry-After')
+            if retry_after is not None:
+                try:
+                    delay = float(retry_after)
+                except ValueError:
+                    try:
+                        delay = (email.utils.parsedate_to_datetime(
+                                retry_after) - datetime.datetime.now(
+                                datetime.timezone.utc)).total_seconds()
+                    except (TypeError, ValueError):
+                        delay = 0
+                host_info['blocked_until'] = max(
+                        host_info['blocked_until'],
+                        time.monotonic() + min(max(delay, 0), retry_after_max))
+        else:
+            host_info['rate'] = min(host_info['rate_max'],
+                                    host_info['rate'] + host_rate_step)
+
+def hostStats():
+    '''
+    Purpose: Reports the scheduling statistics of every host requested so far
+
+    Inputs
+    ------
+        None
+
+    Outputs
+    -------
+        stats : dictionary
+            keys are the hosts; values are dictionaries with the host's
+            current `rate` (requests per second), the number of requests
+            `waiting` for the host right now (queue depth) and the most that
+            ever were (`waiting_max`), the number of `requests` sent, the
+            number of responses which asked us to slow down (`throttled`)
+            and the average number of seconds a request waited for its turn
+            (`wait_avg`)
+    '''
+    stats = {}
+    with host_lock:
+        for host, host_info in host_dict.items():
+            stats[host] = {
+                    'rate': host_info['rate'],
+                    'waiting': host_info['waiting'],
+                    'waiting_max': host_info['waiting_max'],
+                    'requests': host_info['requests'],
+                    'throttled': host_info['throttled'],
+                    'wait_avg': host_info['wait_time'] / max(
+                            host_info['requests'], 1)}
+    return stats
+
+def requestURL(url, request_headers=None):
+    '''
+    Purpose: Sends a request for a specified URL through the shared session
+        once the host's scheduler allows it, adapting the host's rate to the
+        response.  A request which the host rate limits or fails with a
+        server error (see `throttle_status`) is sent again (up to
+        `retry_count` times) once the host's slower rate allows it.
+
+    Inputs
+    ------
+        url : string
+            Link to the designated website to be requested
+        request_headers : dictionary
+            Additional headers to send with the request (optional)
+
+    Outputs
+    -------
+        r : requests.Response
+            Response returned by the website
+    '''
+    for attempt in range(retry_count + 1):
+        with hostSlot(url):
+            r = getSession().get(url, headers=request_headers,
+                                 timeout=timeout)
+        adaptHostRate(url, r)
+        if r.status_code not in throttle_status:
+            break
+    return r
+
+def getSession():
+    '''
+    Purpose: Returns the session shared by all requests, creating it (with
+        a pool of `pool_size` connections per host and the retry policy) on
+        first use
+
+    Inputs
+    ------
+        None
+
+    Outputs
+    -------
+        session : requests.Session
+            Session used to request every page
+    '''
+    global session
+    with session_lock:
+        if session is None:
+            # responses are handed back even if they ask us to slow down,
+            #   so that the host's scheduler can adapt to them
+            retry = Retry(total=retry_count, connect=retry_count,
+                          read=retry_count, status=0,
+                          backoff_factor=retry_backoff,
+                          raise_on_status=False,
+                          respect_retry_after_header=False)
+            adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=pool_size, pool_maxsize=pool_size,
+                    max_retries=retry)
+            new_session = requests.Session()
+            new_session.headers.update(headers)
+            new_session.mount('http://', adapter)
+            new_session.mount('https://', adapter)
+            session = new_session
+    return session
+
+def fetchStats():
+    '''
+    Purpose: Reports how well connections are being reused by the shared
+        session and how many pages the response cache saved
+
+    Inputs
+    ------
+        None
+
+    Outputs
+    -------
+        stats : dictionary
+            Number of `requests` sent, number of `connections` opened and
+            number of requests which `reused` an open connection, along with
+            the `cache_counts` of pages fetched through the cache
+    '''
+    stats = {'requests': 0, 'connections': 0, 'reused': 0}
+    with cache_lock:
+        stats.update(('cache_' + key, value) for key, value in
+                     cache_counts.items())
+    if session is None:
+        return stats
+    for adapter in set(session.adapters.values()):
+        for key in adapter.poolmanager.pools.keys():
+            pool = adapter.poolmanager.pools[key]
+            stats['requests'] += pool.num_requests
+            stats['connections'] += pool.num_connections
+    stats['reused'] = max(stats['requests'] - stats['connections'], 0)
+    return stats
+
+def reportStats():
+    '''
+    Purpose: Prints the statistics of every request made so far (see
+        `fetchStats` and `hostStats`), i.e. at the end of a scrape so the
+        effect of the connection reuse, the cache and every host's rate
+        limiting can be followed from run to run
+
+    Inputs
+    ------
+        None
+
+    Outputs
+    -------
+        None
+    '''
+    stats = fetchStats()
+    print('Requests: %d sent over %d connections (%d reused)' % (
+            stats['requests'], stats['connections'], stats['reused']))
+    print('Cache: %d hits, %d revalidated, %d downloaded' % (
+            stats['cache_hits'], stats['cache_revalidated'],
+            stats['cache_downloaded']))
+    for host, host_info in sorted(hostStats().items()):
+        print('%s: %d requests, %d throttled, %.2f requests/second, '
+              '%.2f seconds average wait, %d most waiting' % (
+                      host, host_info['requests'], host_info['throttled'],
+                      host_info['rate'], host_info['wait_avg'],
+                      host_info['waiting_max']))
+
+def countCache(key):
+    '''
+    Purpose: Adds a page to one of the `cache_counts`
+
+    Inputs
+    ------
+        key : string
+            `hits`, `revalidated` or `downloaded`
+
+    Outputs
+    -------
+        None
+    '''
+    with cache_lock:
+        cache_counts[key] += 1
+
+def cacheFile(url):
+    '''
+    Purpose: Returns the path of the cache file for a specified URL
+
+    Inputs
+    ------
+        url : string
+            Link of the cached page
+
+    Outputs
+    -------
+        path : string
+            Path of the (gzip compressed) cache file
+    '''
+    key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+    return os.path.join(cache_path, key[:2], key + '.json.gz')
+
+def readCache(url):
+    '''
+    Purpose: Reads the cached copy of a specified URL (if there is one)
+
+    Inputs
+    ------
+        url : string
+            Link of the cached page
+
+    Outputs
+    -------
+        entry : dictionary
+            Cached `url`, `status`, `headers`, `content` (latin-1 decoded
+            bytes) and `fetched` time, or None if the page isn't cached
+    '''
+    try:
+        with gzip.open(cacheFile(url), 'rt', encoding='utf-8') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if entry.get('url') != url:
+        return None
+    return entry
+
+def writeCache(url, entry):
+    '''
+    Purpose: Stores the cached copy of a specified URL
+
+    Inputs
+    ------
+        url : string
+            Link of the cached page
+        entry : dictionary
+            Cached page (see `readCache`)
+
+    Outputs
+    -------
+        None
+    '''
+    path = cacheFile(url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # write to a temporary file first so readers never see a partial file
+    path_temp = '%s.%d.%d' % (path, os.getpid(), threading.get_ident())
+    with gzip.open(path_temp, 'wt', encoding='utf-8') as f:
+        json.dump(entry, f)
+    os.replace(path_temp, path)
+
+def responseFromCache(entry):
+    '''
+    Purpose: Rebuilds a `requests.Response` from a cached page
+
+    Inputs
+    ------
+        entry : dictionary
+            Cached page (see `readCache`)
+
+    Outputs
+    -------
+        r : requests.Response
+            Response with the cached content, status and headers
+    '''
+    r = requests.Response()
+    r.url = entry['url']
+    r.status_code = entry['status']
+    r.headers = requests.structures.CaseInsensitiveDict(entry['headers'])
+    r._content = entry['content'].encode('latin-1')
+    r.encoding = requests.utils.get_encoding_from_headers(r.headers)
+    return r
+
+def fetchURL(url):
+    '''
+    Purpose: Requests a specified URL through the shared session (or the
+        response cache, see `cache_path`)
+
+    Inputs
+    ------
+        url : string
+            Link to the designated website to be requested
+
+    Outputs
+    -------
+        r : requests.Response
+            Response returned by the website
+    '''
+    if cache_path is None:
+        return requestURL(url)
+
+    # use the cached copy if it's still fresh (or if it's all we may use)
+    entry = readCache(url)
+    if entry is not None and (cache_only or cache_ttl is None or
+                              time.time() - entry['fetched'] < cache_ttl):
+        countCache('hits')
+        return responseFromCache(entry)
+    if cache_only:
+        raise requests.exceptions.ConnectionError(
+                'Page is not cached (cache_only is set): ' + url)
+
+    # otherwise ask the website whether the cached copy is still valid
+    request_headers = {}
+    if entry is not None:
+        if 'ETag' in entry['headers']:
+            request_headers['If-None-Match'] = entry['headers']['ETag']
+        if 'Last-Modified' in entry['headers']:
+            request_headers['If-Modified-Since'] = entry['headers'][
+                    'Last-Modified']
+    r = requestURL(url, request_headers)
+
+    if r.status_code == 304 and entry is not None:
+        countCache('revalidated')
+        entry['fetched'] = time.time()
+        writeCache(url, entry)
+        return responseFromCache(entry)
+    if r.status_code == 200:
+        countCache('downloaded')
+        writeCache(url, {
+                'url': url,
+                'status': r.status_code,
+                'headers': {key: r.headers[key] for key in [
+                        'Content-Type', 'ETag', 'Last-Modified']
+                            if key in r.headers},
+                'content': r.content.decode('latin-1'),
+                'fetched': time.time()})
+    return r
+
+def soupifyURL(url, parser=None):
+    '''
+    Purpose: Turns a specified URL into BeautifulSoup formatted HTML
+
+    Inputs
+    ------
+        url : string
+            Link to the designated website to be scraped
+        parser : string
+            Parser used by BeautifulSoup (default: `default_parser`)
+
+    Outputs
+    -------
+        soup : html
+            BeautifulSoup formatted HTML data stored as a complex tree of
+            Python objects
+    '''
+    r = fetchURL(url)
+    soup = BeautifulSoup(r.content, parser or default_parser)
+    return soup
+
+def benchmarkParsers(path_pages, parser_list=None, repeat=3):
+    '''
+    Purpose: Times how long every parser takes to parse a folder of saved
+        pages (i.e. pages saved from the website or the response cache)
+
+    Inputs
+    ------
+        path_pages : string
+            Folder containing the saved pages (.htm/.html files)
+        parser_list : list of strings
+            Parsers to compare (default: every installed parser out of
+            'html.parser', 'lxml' and 'html5lib')
+        repeat : int
+            Number of times every page is parsed (default: 3)
+
+    Outputs
+    -------
+        time_dict : dictionary
+            keys are the parsers; values are the average number of seconds
+            taken to parse one page
+    '''
+    page_list = []
+    for name in sorted(os.listdir(path_pages)):
+        if name.endswith(('.htm', '.html')):
+            with open(os.path.join(path_pages, name), 'rb') as f:
+                page_list.append(f.read())
+
+    if parser_list is None:
+        parser_list = ['html.parser']
+        for module, parser in [('lxml', 'lxml'), ('html5lib', 'html5lib')]:
+            try:
+                __import__(module)
+                parser_list.append(parser)
+            except ImportError:
+                pass
+
+    time_dict = {}
+    for parser in parser_list:
+        start = time.perf_counter()
+        for i in range(repeat):
+            for page in page_list:
+                BeautifulSoup(page, parser)
+        time_dict[parser] = (time.perf_counter() - start) / max(
+                repeat * len(page_list), 1)
+        print('%s: %.1f ms per page' % (parser, time_dict[parser]*1000))
+    return time_dict
+
+def compareParsers(path_pages, func, parser=None):
+    '''
+    Purpose: Checks whether a scraper's parsing function extracts the same
+        data from a folder of saved pages with another parser as it does
+        with the default parser (i.e. before a scraper opts in to lxml)
+
+    Inputs
+    ------
+        path_pages : string
+            Folder containing the saved pages (.htm/.html files)
+        func : function
+            Function extracting the data (i.e. a list or dictionary) from
+            the BeautifulSoup of a page
+        parser : string
+            Parser to compare to `default_parser` (default: `fast_parser`)
+
+    Outputs
+    -------
+        mismatch_list : list of strings
+            Names of the pages whose extracted data differs between the two
+            parsers
+    '''
+    parser = parser or fast_parser
+    mismatch_list = []
+    for name in sorted(os.listdir(path_pages)):
+        if name.endswith(('.htm', '.html')):
+            with open(os.path.join(path_pages, name), 'rb') as f:
+                page = f.read()
+            if (func(BeautifulSoup(page, default_parser)) !=
+                    func(BeautifulSoup(page, parser))):
+                mismatch_list.append(name)
+                print('Parsers disagree on: ' + name)
+    return mismatch_list
+
+def mapConcurrently(func, item_list, max_workers=8):
+    '''
+    Purpose: Applies a function to every item in a list using a bounded
+        pool of worker threads (suited to scraping functions which spend
+        most of their time waiting on the network)
+
+    Inputs
+    ------
+        func : function
+            Function to apply to every item
+        item_list : list
+            Items to process (i.e. player information)
+        max_workers : int
+            Maximum number of items processed at once (default: 8); a value
+            of 1 processes the items one at a time in the calling thread
+
+    Outputs
+    -------
+        result_list : list
+            Output of `func` for every item, in the same order as
+            `item_list`
+    '''
+    if max_workers == 1:
+        return [func(item) for item in item_list]
+
+    with concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers) as executor:
+        result_list = list(executor.map(func, item_list))
+    return result_list
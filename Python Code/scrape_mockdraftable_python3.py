@@ -13,9 +13,15 @@ Created on Mon Apr  2 14:26:57 2018
     position groups, grabbing player information as we go.  The way positions 
     are stored on the site are very interesting.  
     
-    They basic format is listed below:
+    The result pages of every position are fetched directly (the URL of each
+    page is built from its page number), several pages at a time.  The
+    original approach of clicking through the pages with a headless Firefox
+    browser is kept as a fallback (set `use_browser` to True).
     
 :REQUIRES:
+    - scrape_fetch.py
+    - school_names.py
+    - Selenium (only if `use_browser` is True)
    
 :TODO:
 """
@@ -82,10 +88,8 @@ Created on Mon Apr  2 14:26:57 2018
 #==============================================================================
 import json
 import os
-from selenium import webdriver
-from selenium.webdriver.firefox.options import Options
-from bs4 import BeautifulSoup
-import requests
+from scrape_fetch import mapConcurrently, reportStats, soupifyURL
+from school_names import load_alias_map, standardize_names
 import pandas as pd
 
 #==============================================================================
@@ -169,9 +173,9 @@ def getVariableName(name):
                     '60 Yard Shuttle':'combine60shuttle'}
     return(variableDict[name])
 
-def makeURL(position):
+def makeURL(position, page=1):
     #baseURL = 'https://www.mockdraftable.com/search?position=QB&beginYear=1999&endYear=2018&sort=DESC&page='
-    URL = 'https://www.mockdraftable.com/search?position=' + position + '&beginYear=1999&endYear=2018&sort=DESC&page=1'
+    URL = 'https://www.mockdraftable.com/search?position=' + position + '&beginYear=1999&endYear=2018&sort=DESC&page=' + str(page)
     return URL
 
 def pageNumberStatus(soup):
@@ -226,6 +230,50 @@ def retrievePlayerInfo(soup,url):
     
     return playerDict
 
+def retrievePositionURLs(position):
+    '''
+        Retrieve the links of every player in a position group by fetching
+        every result page of the position directly.  The first page reveals
+        the number of the last page, so the remaining pages are then fetched
+        all at once (repeated in case the page buttons only show some of
+        the pages).
+    '''
+    soupList = [soupifyURL(makeURL(position, 1), 'html5lib')]
+    pageStatus = pageNumberStatus(soupList[0])
+    while (pageStatus[0] < pageStatus[1]):
+        soupList.extend(mapConcurrently(
+                lambda page: soupifyURL(makeURL(position, page), 'html5lib'),
+                range(pageStatus[0] + 1, pageStatus[1] + 1)))
+        pageStatus = pageNumberStatus(soupList[-1])
+
+    linkList = []
+    for soup in soupList:
+        linkList = retrievePlayerURL(soup, linkList)
+    return linkList
+
+def retrievePositionURLsBrowser(browser, position):
+    '''
+        Retrieve the links of every player in a position group by clicking
+        through the result pages of the position in a (Selenium) browser.
+    '''
+    # make the first version of the URL
+    browser.get(makeURL(position))
+    pageStatus = [0, 1]    
+    
+    # Iterate through every subsequent page in the position group
+    linkList = []
+    while (pageStatus[0] < pageStatus[1]):
+        soup = soupifyURL(browser.current_url, 'html5lib')
+        pageStatus = pageNumberStatus(soup)
+        #print('Current Page: ' + str(pageStatus[0]) + ', Next Page: ' + str(pageStatus[1]))
+        
+        linkList = retrievePlayerURL(soup, linkList)
+
+        # advance the page
+        advancePage(browser)
+        #time.sleep(3)
+    return linkList
+
 def retrievePlayerURL(soup,linkList):
     playerLinks = soup.find_all('a', {'class':'list-group-item list-group-item-action justify-content-between d-flex'})
     for link in playerLinks:
@@ -252,12 +300,6 @@ def setDictVariableTypes(player):
             player[entry] = float(player[entry])
     return player
 
-def soupifyURL(url):
-    r = requests.get(url, headers=headers)
-#    soup = BeautifulSoup(r.content,'lxml')
-    soup = BeautifulSoup(r.content,'html5lib')
-    return soup
-
 def standardize_school_names(data):
     '''
     Description:
@@ -272,27 +314,19 @@ def standardize_school_names(data):
     Output:
         data (list) - return the updated list of info
     '''
-    # import the spreadsheet we will be using to standardize school names
-    schoolsDF = pd.read_csv(
-            r'/home/ejreidelbach/projects/NFL/Data/school_abbreviations.csv')
-    schoolsList = schoolsDF.to_dict(orient='records')
-
-    # iterate over element in the input data, look up the school name, and
-    #   set it to the desired value (if it exists)
-    for info in data:
-        # find matching school and change the name, as required
-        for school in schoolsList:
-            if info['college'] in [school['Team'], 
-                          school['Abbreviation1'],
-                          school['Abbreviation2'],
-                          school['Abbreviation3'],
-                          school['Abbreviation4'],
-                          school['Abbreviation5']]:
-                if info['college'] != school['Team']:
-                    print('Changing: ' + info['college'] + ' to ' +
-                          school['Team'])
-                info['college'] = school['Team']
-                break
+    # load the compiled map of every abbreviation of every school name and
+    #   look up all of the school names at once
+    alias_map = load_alias_map(
+            r'/home/ejreidelbach/projects/NFL/Data/school_abbreviations.csv',
+            'abbreviations')
+    names = standardize_names(pd.Series(
+            [info['college'] for info in data], dtype = object), alias_map)
+
+    # set every school name to the desired value (if it exists)
+    for info, name in zip(data, names):
+        if isinstance(info['college'], str) and info['college'] != name:
+            print('Changing: ' + info['college'] + ' to ' + name)
+        info['college'] = name
     
     # return the formatted data
     return data
@@ -301,9 +335,9 @@ def standardize_school_names(data):
 # Working Code
 #==============================================================================
 
-# establish default header information
-headers = {"User-agent":
-           "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/47.0.2526.80 Safari/537.36"}
+# Click through the result pages with a browser rather than fetching them
+#   directly (only needed if the site stops serving the pages without one)
+use_browser = False
 
 # create a list of all the positions we'll be scraping
 positionList = ['QB','FB','HB','WR','TE','OT','OG','OC','ST','DT','DE','EDGE','ILB','OLB','SS','FS','CB']
@@ -313,44 +347,35 @@ os.chdir(r'/home/ejreidelbach/projects/NFL/Data/Combine')
 
 player_URL_List = []
 
-# Open a Headless Firefox browser
-options = Options()
-options.set_headless(headless=True)
-browser = webdriver.Firefox(firefox_options=options)
-#browser = webdriver.Firefox(executable_path=r'E:\Projects\geckodriver.exe')
-browser.implicitly_wait(100)
+if use_browser:
+    from selenium import webdriver
+    from selenium.webdriver.firefox.options import Options
+
+    # Open a Headless Firefox browser
+    options = Options()
+    options.set_headless(headless=True)
+    browser = webdriver.Firefox(firefox_options=options)
+    #browser = webdriver.Firefox(executable_path=r'E:\Projects\geckodriver.exe')
+    browser.implicitly_wait(100)
 
 # Iterate through every position we want to scrape
 for position in positionList:
-    # make the first version of the URL
-    url = makeURL(position)
-    browser.get(url)
-    pageStatus = [0, 1]    
     print(position)
-    
-    # Iterate through every subsequent page in the position group
-    while (pageStatus[0] < pageStatus[1]):
-        soup = soupifyURL(browser.current_url)
-        pageStatus = pageNumberStatus(soup)
-        #print('Current Page: ' + str(pageStatus[0]) + ', Next Page: ' + str(pageStatus[1]))
-        
-        player_URL_List = retrievePlayerURL(soup, player_URL_List)
-
-        # advance the page
-        advancePage(browser)
-        #time.sleep(3)
+    if use_browser:
+        player_URL_List.extend(retrievePositionURLsBrowser(browser, position))
+    else:
+        player_URL_List.extend(retrievePositionURLs(position))
         
 # Close the browser
-browser.quit()
+if use_browser:
+    browser.quit()
 
 # Now that we have all the player links, proceed to scrape each player's data
-playerList = []
-urlCount = 0
-for url in player_URL_List:
-    soup = soupifyURL(url)
-    playerList.append(retrievePlayerInfo(soup,url))
-    if (urlCount%100==0): print(urlCount)
-    urlCount+=1  
+#   (several players at a time, kept in their original order)
+playerList = mapConcurrently(
+        lambda url: retrievePlayerInfo(soupifyURL(url, 'html5lib'), url),
+        player_URL_List)
+print('Scraped ' + str(len(playerList)) + ' players')
 
 # Standardize school names
 playerList = standardize_school_names(playerList)
@@ -358,4 +383,7 @@ playerList = standardize_school_names(playerList)
 # Write the contents of the playerList to a .json file
 filename = 'mockdraftable_data.json'
 with open(filename, 'wt') as out:
-    json.dump(playerList, out, sort_keys=True, indent=4, separators=(',', ': '))
\ No newline at end of file
+    json.dump(playerList, out, sort_keys=True, indent=4, separators=(',', ': '))
+
+# Report the requests made and the rate every host was scraped at
+reportStats()
\ No newline at end of file
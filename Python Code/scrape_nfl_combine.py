@@ -9,6 +9,8 @@ Created on Mon Apr  8 14:38:34 2019
     'https://www.pro-football-reference.com/draft/2019-combine.htm'
 
 :REQUIRES:
+    - scrape_fetch.py
+    - school_names.py
    
 :TODO:
 """
@@ -20,12 +22,10 @@ import datetime
 import os  
 import pandas as pd
 import pathlib
-import requests
 import tqdm
-import time
 
-from bs4 import BeautifulSoup
-from requests.packages.urllib3.util.retry import Retry
+from school_names import load_alias_map, standardize_names
+from scrape_fetch import soupifyURL
 from string import digits
 
 #==============================================================================
@@ -35,32 +35,6 @@ from string import digits
 #==============================================================================
 # Function Definitions
 #==============================================================================
-def soupifyURL(url):
-    '''
-    Purpose: Turns a specified URL into BeautifulSoup formatted HTML 
-
-    Inputs
-    ------
-        url : string
-            Link to the designated website to be scraped
-    
-    Outputs
-    -------
-        soup : html
-            BeautifulSoup formatted HTML data stored as a complex tree of 
-            Python objects
-    '''
-    session = requests.Session()
-    retry = Retry(connect=3, backoff_factor=0.5)
-    adapter = requests.adapters.HTTPAdapter(max_retries=retry)
-    session.mount('http://', adapter)
-    session.mount('https://', adapter)
-    
-    r = session.get(url)
-    #r = requests.get(url)
-    soup = BeautifulSoup(r.content,'html.parser')   
-    return soup
-
 def renameSchool(df, name_var):
     '''
     Purpose: Rename a school/university to a standard name as specified in 
@@ -80,48 +54,13 @@ def renameSchool(df, name_var):
             Standardized version of the school's name based on the first value
             in the row in the file `school_abbreviations.csv`
     '''  
-    # read in school name information
-    df_school_names = pd.read_csv('positionData/names_pictures_ncaa.csv')
-     
-    # convert the dataframe to a dictionary such that the keys are the
-    #   optional spelling of each school and the value is the standardized
-    #   name of the school
-    dict_school_names = {}
-    
-    for index, row in df_school_names.iterrows():
-        # isolate the alternative name columns
-        names = row[[x for x in row.index if 'Name' in x]]
-        # convert the row to a list that doesn't include NaN values
-        list_names = [x.strip() for x in names.values.tolist() if str(x) != 'nan']
-        # add the nickname to the team names as an alternative name
-        nickname = row['Nickname'].strip()
-        list_names_nicknames = list_names.copy()
-        for name in list_names:
-            list_names_nicknames.append(name + ' ' + nickname)
-        # extract the standardized team name
-        name_standardized = row['Team'].strip()
-        # add the standardized name
-        list_names_nicknames.append(name_standardized)
-        # add the nickname to the standardized name
-        list_names_nicknames.append(name_standardized + ' ' + nickname)
-        # for every alternative spelling of the team, set the value to be
-        #   the standardized name
-        for name_alternate in list_names_nicknames:
-            dict_school_names[name_alternate] = name_standardized
-            
-    def swapSchoolName(name_old):
-        if ((name_old == 'nan') or (pd.isna(name_old)) or 
-             (name_old == 'none') or (name_old == '')):
-            return ''
-        try:
-            return dict_school_names[name_old]
-        except:
-            print('Did not find: %s' % (name_old))
-            return name_old
-            
-#    df[name_var] = df[name_var].apply(
-#            lambda x: dict_school_names[x] if str(x) != 'nan' else '')
-    df[name_var] = df[name_var].apply(lambda x: swapSchoolName(x))
+    # standardize the names with the compiled map of every alternative 
+    #   spelling of each school (see school_names.py)
+    dict_school_names = load_alias_map('positionData/names_pictures_ncaa.csv',
+                                       'ncaa')
+    df[name_var] = standardize_names(df[name_var], dict_school_names, 
+                                     blank_missing = True, 
+                                     report_missing = True)
         
     return df
 
@@ -142,43 +81,15 @@ def renameNFL(df, name_var):
         df : Pandas Dataframe
             DataFrame containing the standardized team name
     '''  
-    # read in school name information
-    df_team_names = pd.read_csv(path_dir.joinpath(
-            'positionData/names_pictures_nfl.csv'))    
-     
-    # convert the dataframe to a dictionary such that the keys are the
-    #   optional spelling of each team and the value is the standardized
-    #   name of the team
-    dict_team_names = {}
+    # standardize the names with the compiled map of every alternative 
+    #   spelling of each team (see school_names.py)
+    dict_team_names = load_alias_map(path_dir.joinpath(
+            'positionData/names_pictures_nfl.csv'), 'nfl')
+    df[name_var] = standardize_names(df[name_var], dict_team_names, 
+                                     blank_missing = True, 
+                                     report_missing = True)
     
-    for index, row in df_team_names.iterrows():
-        # isolate the alternative name columns
-        names = row[[x for x in row.index if 'name' in x.lower()]]
-        # convert the row to a list that doesn't include NaN values
-        list_names_nicknames = [
-                x for x in names.values.tolist() if str(x) != 'nan']
-        # extract the standardized team name
-        name_standardized = row['Team']
-        # add the standardized name
-        list_names_nicknames.append(name_standardized)
-        # for every alternative spelling of the team, set the value to be
-        #   the standardized name
-        for name_alternate in list_names_nicknames:
-            dict_team_names[name_alternate] = name_standardized
-            
-    def swapteamName(name_old):
-        if ((name_old == 'nan') or (pd.isna(name_old)) or 
-             (name_old == 'none') or (name_old == '')):
-            return ''
-        try:
-            return dict_team_names[name_old]
-        except:
-            print('Did not find: %s' % (name_old))
-            return name_old
-            
-    df[name_var] = df[name_var].apply(lambda x: swapteamName(x))
-    
-    return df      
+    return df
 
 def scrapeCombineAllYears():
     '''
@@ -256,12 +167,10 @@ def scrapeCombineAllYears():
         df_year['id_sr_nfl'] = list_player_ids_nfl
         df_year['url_sr_nfl'] = list_player_urls_nfl
         
-        # Add the data for the year to the list
+        # Add the data for the year to the list (the rate of scraping is
+        #   controlled by the shared scheduler in scrape_fetch.py)
         list_dfs.append(df_year)
         
-        # Wait a second to slow down the rate of scraping
-        time.sleep(1)
-        
     # convert the data from all years into one file
     df_master = pd.DataFrame()
     for df in list_dfs:
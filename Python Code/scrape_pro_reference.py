@@ -8,6 +8,8 @@ Created on Fri Mar 29 13:00:45 2019
 :DESCRIPTION:
 
 :REQUIRES:
+    - scrape_fetch.py
+    - school_names.py
    
 :TODO:
 """
@@ -15,16 +17,20 @@ Created on Fri Mar 29 13:00:45 2019
 #==============================================================================
 # Package Import
 #==============================================================================
+import asyncio
+import concurrent.futures
 import json
 import numpy as np
 import os  
 import pandas as pd
 import pathlib
-import requests
+import re
+import scrape_fetch
 import tqdm
 
-from bs4 import BeautifulSoup, Comment
-from requests.packages.urllib3.util.retry import Retry
+from bs4 import BeautifulSoup
+from school_names import load_alias_map, standardize_names
+from scrape_fetch import soupifyURL
 from string import digits
 
 #==============================================================================
@@ -101,32 +107,6 @@ list_columns_other = ['Year','Age','position_nfl','Player','nameFirst','nameLast
 #==============================================================================
 # Function Definitions
 #==============================================================================
-def soupifyURL(url):
-    '''
-    Purpose: Turns a specified URL into BeautifulSoup formatted HTML 
-
-    Inputs
-    ------
-        url : string
-            Link to the designated website to be scraped
-    
-    Outputs
-    -------
-        soup : html
-            BeautifulSoup formatted HTML data stored as a complex tree of 
-            Python objects
-    '''
-    session = requests.Session()
-    retry = Retry(connect=3, backoff_factor=0.5)
-    adapter = requests.adapters.HTTPAdapter(max_retries=retry)
-    session.mount('http://', adapter)
-    session.mount('https://', adapter)
-    
-    r = session.get(url)
-    #r = requests.get(url)
-    soup = BeautifulSoup(r.content,'html.parser')   
-    return soup
-
 def extractColumnNames(list_columns, category):
     '''
     Extract column names given a multi-tiered column list (i.e. tuples)
@@ -228,49 +208,13 @@ def renameSchool(df, name_var):
         df : Pandas Dataframe
             DataFrame containing the standardized team name 
     '''  
-    # read in school name information
-    df_school_names = pd.read_csv(path_dir.joinpath(
-            'Data/names_pictures_ncaa.csv'))    
-     
-    # convert the dataframe to a dictionary such that the keys are the
-    #   optional spelling of each school and the value is the standardized
-    #   name of the school
-    dict_school_names = {}
-    
-    for index, row in df_school_names.iterrows():
-        # isolate the alternative name columns
-        names = row[[x for x in row.index if 'Name' in x]]
-        # convert the row to a list that doesn't include NaN values
-        list_names = [x.strip() for x in names.values.tolist() if str(x) != 'nan']
-        # add the nickname to the team names as an alternative name
-        nickname = row['Nickname'].strip()
-        list_names_nicknames = list_names.copy()
-        for name in list_names:
-            list_names_nicknames.append(name + ' ' + nickname)
-        # extract the standardized team name
-        name_standardized = row['Team'].strip()
-        # add the standardized name
-        list_names_nicknames.append(name_standardized)
-        # add the nickname to the standardized name
-        list_names_nicknames.append(name_standardized + ' ' + nickname)
-        # for every alternative spelling of the team, set the value to be
-        #   the standardized name
-        for name_alternate in list_names_nicknames:
-            dict_school_names[name_alternate] = name_standardized
-            
-    def swapSchoolName(name_old):
-        if ((name_old == 'nan') or (pd.isna(name_old)) or 
-             (name_old == 'none') or (name_old == '')):
-            return ''
-        try:
-            return dict_school_names[name_old]
-        except:
-            print('Did not find: %s' % (name_old))
-            return name_old
-            
-#    df[name_var] = df[name_var].apply(
-#            lambda x: dict_school_names[x] if str(x) != 'nan' else '')
-    df[name_var] = df[name_var].apply(lambda x: swapSchoolName(x))
+    # standardize the names with the compiled map of every alternative 
+    #   spelling of each school (see school_names.py)
+    dict_school_names = load_alias_map(path_dir.joinpath(
+            'Data/names_pictures_ncaa.csv'), 'ncaa')
+    df[name_var] = standardize_names(df[name_var], dict_school_names, 
+                                     blank_missing = True, 
+                                     report_missing = True)
     
     return df  
 
@@ -291,43 +235,15 @@ def renameNFL(df, name_var):
         df : Pandas Dataframe
             DataFrame containing the standardized team name
     '''  
-    # read in school name information
-    df_school_names = pd.read_csv(path_dir.joinpath(
-            'Data/names_pictures_nfl.csv'))    
-     
-    # convert the dataframe to a dictionary such that the keys are the
-    #   optional spelling of each school and the value is the standardized
-    #   name of the school
-    dict_school_names = {}
-    
-    for index, row in df_school_names.iterrows():
-        # isolate the alternative name columns
-        names = row[[x for x in row.index if 'name' in x.lower()]]
-        # convert the row to a list that doesn't include NaN values
-        list_names_nicknames = [
-                x for x in names.values.tolist() if str(x) != 'nan']
-        # extract the standardized team name
-        name_standardized = row['Team']
-        # add the standardized name
-        list_names_nicknames.append(name_standardized)
-        # for every alternative spelling of the team, set the value to be
-        #   the standardized name
-        for name_alternate in list_names_nicknames:
-            dict_school_names[name_alternate] = name_standardized
-            
-    def swapSchoolName(name_old):
-        if ((name_old == 'nan') or (pd.isna(name_old)) or 
-             (name_old == 'none') or (name_old == '')):
-            return ''
-        try:
-            return dict_school_names[name_old]
-        except:
-            print('Did not find: %s' % (name_old))
-            return name_old
-            
-    df[name_var] = df[name_var].apply(lambda x: swapSchoolName(x))
+    # standardize the names with the compiled map of every alternative 
+    #   spelling of each team (see school_names.py)
+    dict_team_names = load_alias_map(path_dir.joinpath(
+            'Data/names_pictures_nfl.csv'), 'nfl')
+    df[name_var] = standardize_names(df[name_var], dict_team_names, 
+                                     blank_missing = True, 
+                                     report_missing = True)
     
-    return df  
+    return df
 
 def standardizeLogoNCAA(df):
     '''
@@ -394,6 +310,43 @@ def standardizeLogoNFL(df):
     
     return df
 
+def extractCommentedTables(content, list_ids):
+    '''
+    Purpose: Extract the HTML of the specified tables from the parts of a
+        page that are commented out by the site, by scanning the raw page
+        rather than parsing every comment
+
+    Inputs
+    ------
+        content : bytes
+            Raw HTML of the page
+        list_ids : list of strings
+            IDs of the tables to extract (i.e. 'passing')
+
+    Outputs
+    -------
+        list_tables : list of tuples
+            (table ID, table HTML) for every table found, in the order of
+            the comments they are in (and of `list_ids` within a comment)
+    '''
+    list_tables = []
+    for comment in re.finditer(rb'<!--(.*?)-->', content, re.S):
+        text = comment.group(1)
+        # skip comments that can't contain a table
+        if b'<table' not in text:
+            continue
+        for table_id in list_ids:
+            match = re.search(rb'<table[^>]*\sid="' + re.escape(
+                    table_id.encode('utf-8')) + rb'"', text)
+            if match is None:
+                continue
+            end = text.find(b'</table>', match.start())
+            if end == -1:
+                continue
+            list_tables.append((table_id, text[match.start():end + 8].decode(
+                    'utf-8', errors='replace')))
+    return list_tables
+
 def scrapePlayerHistory(player):
     '''
     Purpose: Scrape historical player data (on a seasonal level) from 
@@ -414,7 +367,8 @@ def scrapePlayerHistory(player):
     url_player = 'https://www.pro-football-reference.com/%s' % player['href']
     
     # scrape the player's page
-    soup = soupifyURL(url_player)
+    r = scrape_fetch.fetchURL(url_player)
+    soup = BeautifulSoup(r.content, scrape_fetch.default_parser)
     
     #--- obtain basic player information -------------------------------------#
     info = soup.find('div', {'id':'meta'})
@@ -507,22 +461,20 @@ def scrapePlayerHistory(player):
         except:
             pass      
         
-    # search for data that is commented out by the site
-    commented_data = soup.find_all(string=lambda text:isinstance(text,Comment))
-    for comment in commented_data:
-        soup_comment = BeautifulSoup(str(comment), 'lxml')
-        for cat_id in ['passing', 'rushing_and_receiving', 
-                       'receiving_and_rushing', 'defense']:
-            try:
-                #create a dataframe of the data
-                df_temp = pd.read_html(str(
-                        soup_comment.find('table', {'id':cat_id})))[0]
-                # rename columns (requires special code as AV not always present)
-                df_temp.columns = extractColumnNames(df_temp.columns.tolist(), cat_id)
-                # add to list of player's historical data
-                list_player_data.append(df_temp)
-            except:
-                pass
+    # search for data that is commented out by the site (only the tables of
+    #   interest are extracted from the raw page and parsed)
+    for cat_id, table in extractCommentedTables(r.content, [
+            'passing', 'rushing_and_receiving', 'receiving_and_rushing',
+            'defense']):
+        try:
+            #create a dataframe of the data
+            df_temp = pd.read_html(table)[0]
+            # rename columns (requires special code as AV not always present)
+            df_temp.columns = extractColumnNames(df_temp.columns.tolist(), cat_id)
+            # add to list of player's historical data
+            list_player_data.append(df_temp)
+        except:
+            pass
     
     #---- Conduct Dataframe Cleanup ------------------------------------------#
     # account for years in which a player missed the season due to injury
@@ -600,6 +552,132 @@ def scrapePlayerHistory(player):
     
     return df_player    
 
+def retrieveCategoryPlayers(list_categories, list_years):
+    '''
+    Purpose: Obtain the (deduplicated) list of players for every category
+        across all of the specified years
+
+    Inputs
+    ------
+        list_categories : list of strings
+            categories for which players are to be scraped (i.e. passing)
+        list_years : list of strings
+            years for which players are to be scraped (i.e. 2018)
+
+    Outputs
+    -------
+        dict_category_players : dictionary
+            keys are the categories; values are lists of player dictionaries
+            (see `retrievePlayerList`) in which every player appears once
+    '''
+    list_pairs = [(category, year) for category in list_categories
+                  for year in list_years]
+    list_pages = scrape_fetch.mapConcurrently(
+            lambda x: retrievePlayerList(x[0], x[1]), list_pairs)
+
+    dict_category_players = {category:[] for category in list_categories}
+    for (category, year), list_players in zip(list_pairs, list_pages):
+        dict_category_players[category].extend(list_players)
+
+    # deduplicate each category's list (keeping the last occurrence of every
+    #   player, in the order of those last occurrences)
+    for category, list_players in dict_category_players.items():
+        set_seen = set()
+        list_unique = []
+        for dict_player in reversed(list_players):
+            key = tuple(sorted(dict_player.items()))
+            if key not in set_seen:
+                set_seen.add(key)
+                list_unique.append(dict_player)
+        dict_category_players[category] = list_unique[::-1]
+
+    return dict_category_players
+
+async def scrapePlayerHistoriesAsync(list_players, max_concurrent):
+    '''
+    Purpose: Scrape the historical data of every player in a list, with up
+        to `max_concurrent` players in progress at once (the pages are
+        requested at the rate `scrape_fetch` allows the host, see
+        `scrape_fetch.host_rate_dict`)
+
+    Inputs
+    ------
+        list_players : list of dictionaries
+            players to scrape (see `retrievePlayerList`)
+        max_concurrent : int
+            maximum number of players scraped at the same time
+
+    Outputs
+    -------
+        list_player_stats : list of Pandas DataFrames
+            output of `scrapePlayerHistory` for every player (same order as
+            `list_players`)
+    '''
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_concurrent)
+    executor = concurrent.futures.ThreadPoolExecutor(max_concurrent)
+    progress = tqdm.tqdm(total=len(list_players))
+
+    async def scrapeOne(dict_player):
+        async with semaphore:
+            # fetch and parse the page in a worker thread
+            df_player = await loop.run_in_executor(
+                    executor, scrapePlayerHistory, dict_player)
+            progress.update(1)
+            return df_player
+
+    try:
+        list_player_stats = await asyncio.gather(
+                *[scrapeOne(dict_player) for dict_player in list_players])
+    finally:
+        executor.shutdown()
+        progress.close()
+
+    return list_player_stats
+
+def scrapeCategoryPlayerHistories(dict_category_players, max_concurrent=8):
+    '''
+    Purpose: Scrape the historical data of the players in every category,
+        requesting the page of a player who appears in several categories
+        (i.e. a quarterback in both passing and rushing) only once
+
+    Inputs
+    ------
+        dict_category_players : dictionary
+            output of `retrieveCategoryPlayers`
+        max_concurrent : int
+            maximum number of players scraped at the same time (default: 8);
+            pages are requested at the rate `scrape_fetch` allows the host
+
+    Outputs
+    -------
+        dict_category_stats : dictionary
+            keys are the categories; values are lists with the output of
+            `scrapePlayerHistory` for every player in the category (same
+            order as `dict_category_players`)
+    '''
+    # collect every unique player ID across all categories
+    dict_players = {}
+    for list_players in dict_category_players.values():
+        for dict_player in list_players:
+            dict_players.setdefault(dict_player['ID'], dict_player)
+    print('Scraping %d unique players (%d across all categories)' % (
+            len(dict_players), sum(len(x) for x in
+                                   dict_category_players.values())))
+
+    list_player_stats = asyncio.run(scrapePlayerHistoriesAsync(
+            list(dict_players.values()), max_concurrent))
+    dict_player_stats = dict(zip(dict_players.keys(), list_player_stats))
+
+    # hand every player's data to each category the player is listed in
+    dict_category_stats = {}
+    for category, list_players in dict_category_players.items():
+        dict_category_stats[category] = [
+                dict_player_stats[dict_player['ID']]
+                for dict_player in list_players]
+
+    return dict_category_stats
+
 #==============================================================================
 # Working Code
 #==============================================================================
@@ -608,30 +686,26 @@ def scrapePlayerHistory(player):
 path_dir = pathlib.Path('/home/ejreidelbach/Projects/NFL')
 os.chdir(path_dir)
 
-# Iterate over four different statistical categories
-for category in ['passing', 'rushing', 'receiving', 'defense']:
+# Keep a copy of every page that is downloaded so that later runs only
+#   download pages that have changed (cached pages are revalidated after a
+#   week; set `cache_only` to True to re-parse pages without the network)
+scrape_fetch.cache_path = str(pathlib.Path(path_dir, 'Data', 'Cache'))
+scrape_fetch.cache_ttl = 7*24*60*60
+scrape_fetch.cache_only = False
 
-    list_players_category = []
-    
-    # Iterate over all years from 2005 to 2018
-    for year in list(map(str, range(2005,2019))):
-        list_players_category.append(retrievePlayerList(category, year))
-        
-    # flatten scraped list of players into one master list
-    list_players_flattened = [player for sublist in list_players_category 
-                         for player in sublist]
-    
-    # deduplicate flattened list (sourced code snippet from: 
-    #   https://stackoverflow.com/questions/9427163/remove-duplicate-dict-in-list-in-python)
-    list_players_flattened = [i for n, i in enumerate(
-            list_players_flattened) if i not in list_players_flattened[n + 1:]]
-        
-    # create a list for storing all player historical data
-    list_player_stats = []
-    
-    # Use the list of all players to scrape player historical stats
-    for dict_player in tqdm.tqdm(list_players_flattened):
-        list_player_stats.append(scrapePlayerHistory(dict_player))
+# Retrieve the players in four different statistical categories for all
+#   years from 2005 to 2018
+list_categories = ['passing', 'rushing', 'receiving', 'defense']
+dict_category_players = retrieveCategoryPlayers(
+        list_categories, list(map(str, range(2005,2019))))
+
+# Scrape the historical stats of every player (once, even if the player is
+#   listed in several categories)
+dict_category_stats = scrapeCategoryPlayerHistories(dict_category_players)
+
+# Iterate over four different statistical categories
+for category in list_categories:
+    list_player_stats = dict_category_stats[category]
         
     # convert the list of dataframes into a single dataframe
     df_category = pd.concat(list_player_stats, sort = False)
@@ -740,4 +814,8 @@ for category in ['passing', 'rushing', 'receiving', 'defense']:
             
     # Export the dataframe to disk
     df_final.to_csv('Data/SportsReference/%s-2005-2018.csv' % (category), 
-                       index = False)
\ No newline at end of file
+                       index = False)
+
+# Report the requests made, the pages the cache saved and the rate every host
+#   was scraped at
+scrape_fetch.reportStats()
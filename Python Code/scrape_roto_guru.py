@@ -8,6 +8,7 @@ Created on Tue Apr  2 09:15:10 2019
 :DESCRIPTION:
 
 :REQUIRES:
+    - scrape_fetch.py
    
 :TODO:
 """
@@ -19,9 +20,9 @@ import io
 import os  
 import pandas as pd
 import pathlib
-import requests
 import tqdm
 from bs4 import BeautifulSoup
+from scrape_fetch import fetchURL
 
 #==============================================================================
 # Reference Variable Declaration
@@ -64,7 +65,7 @@ YEARS = list(map(str, range(2014,2019)))
 all_games = pd.DataFrame()
 for yr in tqdm.tqdm(YEARS):
     for wk in tqdm.tqdm(WEEKS):
-        result = requests.get(URL_BASE.replace('WEEK',wk).replace('YEAR',yr))
+        result = fetchURL(URL_BASE.replace('WEEK',wk).replace('YEAR',yr))
         soup = BeautifulSoup(result.content)
         all_games = pd.concat([all_games, pd.read_csv(io.StringIO(soup.find('pre').text), sep = ';')])
 
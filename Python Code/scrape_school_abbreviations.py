@@ -13,6 +13,7 @@ Created on Mon Apr 16 09:48:38 2018
         https://www.reddit.com/r/CFB/wiki/abbreviations
 
 :REQUIRES:
+    - scrape_fetch.py
    
 :TODO:
 """
@@ -21,18 +22,9 @@ Created on Mon Apr 16 09:48:38 2018
 # Package Import
 #==============================================================================
 import os  
-from bs4 import BeautifulSoup
-import requests
+from scrape_fetch import soupifyURL
 import pandas as pd
 
-#==============================================================================
-# Function Definitions / Reference Variable Declaration
-#==============================================================================
-def soupifyURL(url):
-    r = requests.get(url, headers=headers)
-    soup = BeautifulSoup(r.content,'html5lib')
-    return soup
-
 #==============================================================================
 # Working Code
 #==============================================================================
@@ -40,11 +32,8 @@ def soupifyURL(url):
 # Set the project working directory
 os.chdir(r'/home/ejreidelbach/projects/NFL/Data/')
 
-# establish default header information
-headers = {"User-agent":
-           "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/47.0.2526.80 Safari/537.36"}
-
-soup = soupifyURL('https://www.reddit.com/r/CFB/wiki/abbreviations')
+soup = soupifyURL('https://www.reddit.com/r/CFB/wiki/abbreviations',
+                  'html5lib')
 table = soup.find_all('table')[1] 
 df = pd.read_html(str(table))[0]
 
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:10:32 2026
+
+@author: ejreidelbach
+
+:DESCRIPTION:
+    Checks that `scrapeYearByPosition` (scrape_NFL_player_stats.py) only
+    records players as seen once their page has been read, so that a player
+    whose page fails is scraped again by the next run.  The category pages
+    and player pages are replaced by stand-ins, so no network is needed.
+
+    Run with:  python -m unittest test_scrape_NFL_player_stats
+
+:REQUIRES:
+    - scrape_NFL_player_stats.py
+
+:TODO:
+"""
+
+#==============================================================================
+# Package Import
+#==============================================================================
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from bs4 import BeautifulSoup
+import scrape_NFL_player_stats
+
+#==============================================================================
+# Reference Variable Declaration
+#==============================================================================
+# category page listing two players (and no further pages)
+category_page = '''
+<span class="linkNavigation floatRight"><a href="/next">next</a></span>
+<table class="data-table1"><tbody>
+<tr><td>1</td><td><a href="/players/good/1/profile">Good</a></td><td>X</td>
+    <td>WR</td></tr>
+<tr><td>2</td><td><a href="/players/bad/2/profile">Bad</a></td><td>X</td>
+    <td>WR</td></tr>
+</tbody></table>
+'''
+
+#==============================================================================
+# Tests
+#==============================================================================
+class TestScrapeYearByPosition(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.directory.name)
+        self.path_seen = Path(self.directory.name, 'seen_urls.txt')
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+    def scrape(self, failing_list):
+        '''
+            Run `scrapeYearByPosition` for one year with the players in
+            `failing_list` failing to load, and return the urls scraped.
+        '''
+        scraped_list = []
+        def scrapePlayerStats(player, year, index, list_length, position):
+            scraped_list.append(player['url'])
+            if player['url'] in failing_list:
+                return None
+            return {'url': player['url'], 'position': player['position']}
+
+        url_history_set = scrape_NFL_player_stats.loadSeenURLs(
+                self.path_seen, 'WR', self.directory.name)
+        with mock.patch.object(scrape_NFL_player_stats, 'soupifyURL',
+                               lambda url, parser=None: BeautifulSoup(
+                                       category_page, 'html.parser')), \
+             mock.patch.object(scrape_NFL_player_stats, 'scrapePlayerStats',
+                               scrapePlayerStats):
+            scrape_NFL_player_stats.scrapeYearByPosition(
+                    2018, 2018, 'WR', url_history_set, 1, self.path_seen)
+        return scraped_list
+
+    def test_failed_player_is_retried(self):
+        base_url = scrape_NFL_player_stats.base_url
+        good = base_url + '/players/good/1/profile'
+        bad = base_url + '/players/bad/2/profile'
+
+        # the first run fails to read one player...
+        self.assertEqual(self.scrape([bad]), [good, bad])
+        with open(self.path_seen, 'rt') as f:
+            self.assertEqual(f.read(), 'WR ' + good + '\n')
+        with open('2018_WR.json', 'rt') as f:
+            self.assertEqual(json.load(f)[1], None)
+
+        # ...so the next run scrapes only that player again
+        self.assertEqual(self.scrape([]), [bad])
+        with open(self.path_seen, 'rt') as f:
+            self.assertEqual(f.read(), 'WR ' + good + '\nWR ' + bad + '\n')
+
+if __name__ == '__main__':
+    unittest.main()